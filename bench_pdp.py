@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""Benchmark parsing of recorded listing pages (PDP).
+
+Record payloads with the data command, e.g. `./stl.py data 12345 > pdp/12345.json`, then time how long parsing
+takes per listing, without any requests being made.
+
+Usage:
+    bench_pdp.py <payload>... [--repeat=<repeat>]
+
+Options:
+    --repeat=<repeat>  Number of times each payload is parsed [default: 200]
+"""
+import json
+import logging
+import os
+
+from dataclasses import fields
+from time import perf_counter
+
+from docopt import docopt
+
+from stl.endpoint.pdp import ListingSummary, Pdp
+
+GEOGRAPHY = {'city': None, 'country': None, 'placeId': None, 'state': None}
+
+
+def bench(pdp: Pdp, payload: dict, repeat: int) -> float:
+    """Get mean parse time of payload in seconds."""
+    summary = ListingSummary(**{field.name: None for field in fields(ListingSummary)})
+    start = perf_counter()
+    for _ in range(repeat):
+        pdp.parse_listing(payload, summary, GEOGRAPHY, [])
+
+    return (perf_counter() - start) / repeat
+
+
+def main():
+    arguments = docopt(str(__doc__))
+    repeat = int(arguments['--repeat'])
+    pdp = Pdp('', 'USD', logging.getLogger('bench_pdp'))
+    timings = []
+    for path in arguments['<payload>']:
+        with open(path, encoding='utf-8') as f:
+            payload = json.load(f)
+        timings.append(bench(pdp, payload, repeat))
+        print('{:<40} {:>10.1f} µs'.format(os.path.basename(path), timings[-1] * 1e6))
+
+    print('{:<40} {:>10.1f} µs per listing ({} payloads x {})'.format(
+        'mean', sum(timings) / len(timings) * 1e6, len(timings), repeat))
+
+
+if __name__ == "__main__":
+    main()
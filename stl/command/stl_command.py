@@ -1,3 +1,4 @@
+import datetime
 import json
 import logging
 import os
@@ -7,15 +8,20 @@ from elasticsearch import Elasticsearch
 from elastic_transport import ConnectionError
 from logging import Logger
 
+from stl.endpoint.cache import QuoteCache, ResponseCache
 from stl.endpoint.calendar import Calendar, Pricing
 from stl.endpoint.explore import Explore
 from stl.endpoint.pdp import Pdp
 from stl.endpoint.reviews import Reviews
+from stl.endpoint.transport import HttpTransport
 from stl.persistence.csv import Csv
 from stl.persistence.json import Json
+from stl.persistence.jsonl import JsonLines
+from stl.persistence.parquet import Parquet
 from stl.persistence.elastic import Elastic
 from stl.persistence import PersistenceInterface
 from stl.scraper.airbnb_scraper import AirbnbSearchScraper, AirbnbCalendarScraper, AirbnbScraperInterface
+from stl.scraper.checkpoint import SearchCheckpoint
 
 
 class StlCommand:
@@ -23,8 +29,8 @@ class StlCommand:
 
 Usage:
     stl.py search <query> [--interval=<interval>] [--radius=<radius>] [--checkin=<checkin> --checkout=<checkout> [--priceMin=<priceMin>] [--priceMax=<priceMax>]] \
-[--roomTypes=<roomTypes>] [--storage=<storage> [--projectpath=<projectpath>]] [--currency=<currency>] [--search_by_map=<search_by_map> [--ne_lat=<ne_lat>] [--ne_lng=<ne_lng>] [--sw_lat=<sw_lat>] [--sw_lng=<sw_lng>]] [-v|--verbose]
-    stl.py calendar (<listingId> | --all) [--updated=<updated>]
+[--roomTypes=<roomTypes>] [--storage=<storage> [--projectpath=<projectpath>] [--append]] [--currency=<currency>] [--search_by_map=<search_by_map> [--ne_lat=<ne_lat>] [--ne_lng=<ne_lng>] [--sw_lat=<sw_lat>] [--sw_lng=<sw_lng>]] [--concurrency=<concurrency>] [--refresh] [--resume] [--reviews] [-v|--verbose]
+    stl.py calendar (<listingId> | --all) [--updated=<updated>] [--concurrency=<concurrency>]
     stl.py pricing <listingId> --checkin=<checkin> --checkout=<checkout>
     stl.py data <listingId>
 
@@ -37,12 +43,17 @@ Options:
     --checkout=<checkout>  Check-out date, e.g. "2023-06-30"
     --priceMin=<priceMin>  Minimum nightly or monthly price
     --priceMax=<priceMax>  Maximum nightly or monthly price
+    --interval=<interval>  Sweep every <interval>-night stay between --checkin and --checkout
     --radius=<radius>      Radius for search
-    --search_by_map=<search_by_map>  Search within a map box
+    --search_by_map=<search_by_map>  Search within a map box, split into tiles if it has more than 300 results
     --ne_lat=<ne_lat>      Search within a map box
     --ne_lng=<ne_lng>      Search within a map box
     --sw_lat=<sw_lat>      Search within a map box
     --sw_lng=<sw_lng>      Search within a map box
+    --concurrency=<concurrency>  Number of listings to fetch or update in parallel (default: 1)
+    --refresh              Fetch all listing pages, also for listings unchanged since they were last saved
+    --resume               Resume the last run of the same search, if it failed (implies --append for CSV)
+    --reviews              Get listing reviews too, only those newer than the saved reviews of a listing
     --updated=<updated>    Only update listings not updated in given period. Prevents updating listings that have been \
 recently updated. [default: 1d]
     --all                  Update calendar for all listings (requires Elasticsearch backend)
@@ -50,36 +61,60 @@ recently updated. [default: 1d]
 Global Options:
     --currency=<currency>  "USD", "EUR", etc. (default: USD)
     --source=<source>      Only allows "airbnb" [default: airbnb]
-    --storage=<storage>    csv or elasticsearch or json (default: csv)
+    --storage=<storage>    csv or elasticsearch or json or jsonl or parquet (default: csv)
     --projectpath=<projectpath>  Target path for persistence
+    --append               Append to an existing CSV file instead of overwriting it
     -v, --verbose          Verbose logging output
 """
 
+    # endpoints, persistence and caches are expensive to set up and are reused by every command run in the same
+    # interpreter (e.g. repeated `main()` calls from the Pyodide web worker)
+    __resources = {}
+
     def __init__(self, args: dict):
         self.__args = args
         self.__logger = StlCommand.__get_logger(bool(args.get('--verbose')))
+        self.__transport = HttpTransport.shared()
+        self.__cache = self.__get_resource(('cache', os.getenv('HTTP_CACHE_PATH')), ResponseCache.from_env)
+        self.__quote_cache = self.__get_resource(
+            ('quotes', os.getenv('PRICING_CACHE_PATH') or os.getenv('HTTP_CACHE_PATH')), QuoteCache.from_env)
 
     @staticmethod
     def __get_logger(is_verbose: bool) -> Logger:
         """Configure and get logger instance."""
+        level = logging.INFO if is_verbose else logging.WARNING
         logging.basicConfig(
-            level=logging.INFO if is_verbose else logging.WARNING,
+            level=level,
             format='%(asctime)s [%(levelname)s] %(message)s',
             handlers=[logging.StreamHandler(sys.stdout)]
         )
+        logging.getLogger().setLevel(level)  # basicConfig is a no-op on repeated calls
         return logging.getLogger(__class__.__module__.lower())
 
+    @classmethod
+    def __get_resource(cls, key: tuple, factory):
+        """Get resource from the warm-start registry, creating it on first use."""
+        if key not in cls.__resources:
+            cls.__resources[key] = factory()
+        return cls.__resources[key]
+
     def execute(self):
-        project_path = self.__args.get('--projectpath') or os.path.dirname(os.path.realpath('{}/../../'.format(__file__)))
-        currency = self.__args.get(
-            '--currency') or os.getenv('SEARCH_CURRENCY', 'USD')
+        project_path = self.__get_project_path()
+        currency = self.__get_currency()
         if self.__args.get('search'):
             query = self.__args['<query>']
             self.__logger.info(f'Processing search query: {query}')
-            persistence = self.__create_persistence(project_path, query)
-            scraper = self.__create_scraper('search', persistence, currency)
             params = self.__get_search_params()
-            scraper.run(query, params)
+            windows = self.__get_sweep_windows()
+            checkpoint = SearchCheckpoint(os.path.join(project_path, '.checkpoints'), query, params, windows)
+            if not self.__args.get('--resume'):
+                checkpoint.clear()
+            persistence = self.__create_persistence(project_path, query, resume=checkpoint.exists())
+            scraper = self.__create_scraper('search', persistence, currency)
+            if windows:
+                scraper.sweep(query, params, windows, checkpoint)
+            else:
+                scraper.run(query, params, checkpoint)
 
         elif self.__args.get('calendar'):
             if self.__args.get('--all') and self.__args.get('--storage') == 'csv':
@@ -93,15 +128,14 @@ Global Options:
             scraper.run(source, self.__args.get('--updated'))
 
         elif self.__args.get('data'):
-            pdp = Pdp(os.getenv('AIRBNB_API_KEY'), currency, self.__logger, cors_api_key=os.getenv('CORS_API_KEY'))
+            pdp = self.__create_endpoint(Pdp, currency)
             print(json.dumps(pdp.get_raw_listing(self.__args.get('<listingId>'))))
 
         elif self.__args.get('pricing'):
             listing_id = self.__args.get('<listingId>')
             checkin = self.__args.get('--checkin')
             checkout = self.__args.get('--checkout')
-            pricing = Pricing(os.getenv('AIRBNB_API_KEY'),
-                              currency, self.__logger, cors_api_key=os.getenv('CORS_API_KEY'))
+            pricing = self.__create_endpoint(Pricing, currency)
             total = pricing.get_pricing(checkin, checkout, listing_id)
             print('https://www.airbnb.com/rooms/{} - {} to {}: {}'.format(listing_id,
                   checkin, checkout, total))
@@ -110,6 +144,20 @@ Global Options:
             raise RuntimeError(
                 'ERROR: Unexpected command:\n{}'.format(*self.__args))
 
+        if self.__cache:
+            self.__logger.info('Response cache: {hits} hits, {misses} misses, {entries} entries ({bytes} bytes)'.format(
+                **self.__cache.stats()))
+        if self.__quote_cache:
+            self.__logger.info('Quote cache: {hits} hits, {misses} misses, {entries} entries'.format(
+                **self.__quote_cache.stats()))
+
+    def __get_project_path(self) -> str:
+        return self.__args.get('--projectpath') or os.path.dirname(os.path.realpath('{}/../../'.format(__file__)))
+
+    def __get_currency(self) -> str:
+        return self.__args.get(
+            '--currency') or os.getenv('SEARCH_CURRENCY', 'USD')
+
     def __create_scraper(
             self,
             scraper_type: str,
@@ -117,48 +165,90 @@ Global Options:
             currency: str
     ) -> AirbnbScraperInterface:
         """Create scraper of given type using given parameters."""
-        api_key = os.getenv('AIRBNB_API_KEY')
-        cors_api_key = os.getenv('CORS_API_KEY')
+        endpoints = self.__create_endpoints(scraper_type, currency)
+        if scraper_type == 'search':
+            return AirbnbSearchScraper(
+                *endpoints,
+                persistence,
+                self.__logger,
+                self.__get_concurrency(),
+                refresh=bool(self.__args.get('--refresh')),
+                with_reviews=bool(self.__args.get('--reviews'))
+            )
+        elif scraper_type == 'calendar':
+            return AirbnbCalendarScraper(*endpoints, persistence, self.__logger, self.__get_concurrency())
 
+    def __create_endpoints(self, scraper_type: str, currency: str) -> tuple:
+        """Create (or reuse) the endpoints used by the scraper of given type."""
         if scraper_type == 'search':
-            explore = Explore(api_key, currency, self.__logger, cors_api_key=cors_api_key)
-            pdp = Pdp(api_key, currency, self.__logger, cors_api_key=cors_api_key)
-            reviews = Reviews(api_key, currency, self.__logger, cors_api_key=cors_api_key)
-            return AirbnbSearchScraper(explore, pdp, reviews, persistence, self.__logger)
+            return (
+                self.__create_endpoint(Explore, currency),
+                self.__create_endpoint(Pdp, currency),
+                self.__create_endpoint(Reviews, currency),
+            )
         elif scraper_type == 'calendar':
-            pricing = Pricing(api_key, currency, self.__logger, cors_api_key=cors_api_key)
-            calendar = Calendar(api_key, currency, self.__logger, pricing, cors_api_key=cors_api_key)
-            return AirbnbCalendarScraper(calendar, persistence, self.__logger)
+            pricing = self.__create_endpoint(Pricing, currency)
+            return self.__create_endpoint(Calendar, currency, pricing=pricing),
         else:
             raise RuntimeError('Unknown scraper type: %s' % scraper_type)
 
-    def __create_persistence(self, project_path: str = None, query: str = None) -> PersistenceInterface:
-        """Create persistence layer - either CSV or Elasticsearch."""
+    def __create_endpoint(self, endpoint_class: type, currency: str, **kwargs):
+        """Create endpoint sharing this process' transport and caches. Endpoints are reused across commands with the
+        same API keys and currency."""
+        api_key = os.getenv('AIRBNB_API_KEY')
+        cors_api_key = os.getenv('CORS_API_KEY')
+        if endpoint_class is Pricing:  # POST requests are not cached by URL, quotes are cached by stay instead
+            kwargs['quote_cache'] = self.__quote_cache
+        else:
+            kwargs['cache'] = self.__cache
+
+        return self.__get_resource(
+            (endpoint_class.__name__, currency, api_key, cors_api_key),
+            lambda: endpoint_class(
+                api_key, currency, self.__logger, cors_api_key=cors_api_key, transport=self.__transport, **kwargs)
+        )
+
+    def __create_persistence(
+            self,
+            project_path: str = None,
+            query: str = None,
+            resume: bool = False
+    ) -> PersistenceInterface:
+        """Create persistence layer - CSV, JSON, JSON Lines, Parquet or Elasticsearch. When resuming a search, the
+        CSV file written by the failed run is appended to."""
         storage_type = self.__args.get(
             '--storage') or os.getenv('STORAGE_TYPE')
         if storage_type == 'elasticsearch':
-            es_params = {
-                'hosts':      os.getenv('ELASTIC_HOSTS'),
-                'basic_auth': (os.getenv('ELASTIC_USERNAME'), os.getenv('ELASTIC_PASSWORD')),
-            }
-            if os.getenv('ELASTIC_CA_CERT'):
-                es_params['ca_certs'] = os.getenv('ELASTIC_CA_CERT')
-            else:
-                es_params['verify_certs'] = False
-            persistence = Elastic(Elasticsearch(
-                **es_params), os.getenv('ELASTIC_INDEX'))
-            try:
-                persistence.create_index_if_not_exists(
-                    os.getenv('ELASTIC_INDEX'))
-            except ConnectionError as e:
-                self.__logger.critical(
-                    e.message + '\nCould not connect to elasticsearch.')
-                exit(1)
+            return self.__get_resource(
+                ('elasticsearch', os.getenv('ELASTIC_HOSTS'), os.getenv('ELASTIC_INDEX')), self.__create_elastic)
         elif storage_type == 'json':
-            persistence = Json(project_path)
+            return self.__get_resource(('json', project_path), lambda: Json(project_path))
+        elif storage_type == 'jsonl':
+            return self.__get_resource(('jsonl', project_path), lambda: JsonLines(project_path))
+        elif storage_type == 'parquet':
+            return Parquet(project_path)
         else:  # assume csv
             csv_path = os.path.join(project_path, '{}.csv'.format(query))
-            persistence = Csv(csv_path)
+            return Csv(csv_path, append=bool(self.__args.get('--append')) or resume, skip_written=resume)
+
+    def __create_elastic(self) -> Elastic:
+        es_params = {
+            'hosts':      os.getenv('ELASTIC_HOSTS'),
+            'basic_auth': (os.getenv('ELASTIC_USERNAME'), os.getenv('ELASTIC_PASSWORD')),
+        }
+        if os.getenv('ELASTIC_CA_CERT'):
+            es_params['ca_certs'] = os.getenv('ELASTIC_CA_CERT')
+        else:
+            es_params['verify_certs'] = False
+        persistence = Elastic(Elasticsearch(
+            **es_params), os.getenv('ELASTIC_INDEX'), int(os.getenv('ELASTIC_BULK_SIZE', 500)))
+        try:
+            persistence.create_index_if_not_exists(
+                os.getenv('ELASTIC_INDEX'))
+        except ConnectionError as e:
+            self.__logger.critical(
+                e.message + '\nCould not connect to elasticsearch.')
+            exit(1)
 
         return persistence
 
@@ -191,6 +281,33 @@ Global Options:
 
         return params
 
+    def __get_sweep_windows(self) -> list:
+        """Get (checkin, checkout) windows of --interval nights, for every start date from --checkin through
+        --checkout."""
+        if not (self.__args.get('--interval') and self.__args.get('--checkin') and self.__args.get('--checkout')):
+            return []
+
+        num_days = int(self.__args['--interval'])
+        start = datetime.datetime.strptime(self.__args['--checkin'], '%Y-%m-%d')
+        end = datetime.datetime.strptime(self.__args['--checkout'], '%Y-%m-%d')
+
+        windows = []
+        for i in range((end - start).days - num_days + 1):
+            current_date = start + datetime.timedelta(days=i)
+            windows.append((
+                current_date.strftime('%Y-%m-%d'),
+                (current_date + datetime.timedelta(days=num_days)).strftime('%Y-%m-%d')
+            ))
+
+        return windows
+
+    def __get_concurrency(self) -> int:
+        """Get number of parallel requests, fall back to config. Grows the HTTP pool to match."""
+        concurrency = max(1, int(self.__args.get('--concurrency') or os.getenv('SEARCH_CONCURRENCY', 1)))
+        self.__transport.ensure_pool_size(concurrency)
+
+        return concurrency
+
     def __get_list_arg(self, arg_name: str) -> list | None:
         """Get CLI comma-separated list argument, fall back to config."""
         arg_val = self.__args.get(
@@ -8,20 +8,39 @@ from random import randint
 from time import sleep
 from urllib.parse import urlunparse, urlencode, quote
 
+from stl.endpoint.cache import ResponseCache
+from stl.endpoint.throttle import RateLimiter
+from stl.endpoint.transport import HttpTransport
 from stl.exception.api import ApiException, ForbiddenException
 
 
 class BaseEndpoint(ABC):
     API_PATH = None
+    CACHE_TTL = None  # seconds GET responses may be served from the response cache; None disables caching
     SOURCE = 'airbnb'
 
     # initialize the class
-    def __init__(self, api_key: str, currency: str, logger: Logger, cors_api_key: str = '', locale: str = 'en'):
+    def __init__(
+            self,
+            api_key: str,
+            currency: str,
+            logger: Logger,
+            cors_api_key: str = '',
+            locale: str = 'en',
+            transport: HttpTransport = None,
+            cache: ResponseCache = None
+    ):
         self._api_key = api_key
         self._cors_api_key = cors_api_key
         self._currency = currency
         self._locale = locale
         self._logger = logger
+        self._transport = transport or HttpTransport.shared()
+        self._cache = cache
+
+    @property
+    def transport(self) -> HttpTransport:
+        return self._transport
 
     @staticmethod
     def build_airbnb_url(path: str, query=None):
@@ -34,23 +53,33 @@ class BaseEndpoint(ABC):
         if data is None:
             data = {}
 
+        cacheable = method == 'GET' and self._cache is not None and self.CACHE_TTL
+        if cacheable:
+            cached = self._cache.get(url, self.CACHE_TTL)
+            if cached is not None:
+                return cached
+
         attempts = 0
         headers = {
             'x-airbnb-api-key': self._api_key,
             'x-cors-proxy-api-key': self._cors_api_key,
             'origin': 'https://www.airbnb.com'
         }
-        max_attempts = 3
+        max_attempts = 5
+        retry_after = None
+        new_url = 'https://steak.kurokrosk.workers.dev/' + url
         while attempts < max_attempts:
-            #sleep(0.5)  # do a little throttling
+            if attempts:
+                # back off before retrying; throttling itself is done by the transport's rate limiter
+                sleep(RateLimiter.backoff(attempts, retry_after))
             attempts += 1
+            retry_after = None
             try:
-                new_url = 'https://steak.kurokrosk.workers.dev/' + url
-                response = requests.request(method, new_url, headers=headers, data=data)
+                response = self._transport.request(method, new_url, headers=headers, data=data)
                 response.raise_for_status()  # Check for HTTP errors
             except requests.exceptions.HTTPError as errh:
-                traceback.print_exc()
-                response_json = response.json()
+                self._logger.warning('{}: {}'.format(errh, url))
+                retry_after = self.__get_retry_after(response)
                 continue
             except requests.exceptions.ConnectionError as errc:
                 #traceback.print_exc()
@@ -67,12 +96,22 @@ class BaseEndpoint(ABC):
 
             errors = response_json.get('errors')
             if not errors:
+                if cacheable:
+                    self._cache.set(url, self.API_PATH, response_json)
                 return response_json
 
-            self.__handle_api_error(url, errors, response_json)
+            self.__handle_api_error(new_url, errors, response_json)
 
         raise ApiException(
-            ['Could not complete API {} request to "{}"'.format(method, url)])
+            [{'message': 'Could not complete API {} request to "{}"'.format(method, url)}])
+
+    @staticmethod
+    def __get_retry_after(response) -> float | None:
+        """Get Retry-After delay in seconds for 429/503 responses, if given as a number."""
+        try:
+            return float(response.headers.get('Retry-After'))
+        except (TypeError, ValueError):
+            return None
 
     @staticmethod
     def _put_json_param_strings(query: dict):
@@ -83,6 +122,8 @@ class BaseEndpoint(ABC):
             query['extensions'], separators=(',', ':'))
 
     def __handle_api_error(self, url: str, errors: list, json = None):
+        """Raise for fatal API errors. Retryable errors are reported to the rate limiter and return, so the caller
+        can retry after backing off."""
         error = errors.pop()
         if isinstance(error, dict):
             if error.get('extensions'):
@@ -92,18 +133,17 @@ class BaseEndpoint(ABC):
                     if status_code == 403:
                         self._logger.critical('403 Forbidden: %s' % url)
                         raise ForbiddenException([error])
-                    if status_code >= 500:
-                        # sleep for a minute and then make another attempt
-                        sleep(60)
+                    if status_code == 429 or status_code >= 500:
+                        self._transport.rate_limiter.on_throttle(url)
                         self._logger.warning(error)
                         return
                 elif error['extensions'].get('classification') == 'DataFetchingException':
-                    sleep(60)  # sleep for a minute and then make another attempt
+                    self._transport.rate_limiter.on_throttle(url)
                     self._logger.warning(error['message'])
                     return
 
             if 'please try again' in error['message'].lower():
-                sleep(30)  # sleep 30 seconds then make another attempt
+                self._transport.rate_limiter.on_throttle(url)
                 self._logger.warning(error['message'])
                 return
 
@@ -0,0 +1,226 @@
+import hashlib
+import json
+import os
+import sqlite3
+import zlib
+
+from threading import Lock
+from time import time
+from urllib.parse import parse_qsl, urlparse
+
+
+class ResponseCache:
+    """Persistent on-disk cache of GraphQL GET responses, keyed by normalized request URL.
+
+    Entries expire after the TTL of the endpoint that requested them. Bodies are stored zlib-compressed, and the
+    least recently used entries are evicted once the total stored size exceeds `max_bytes`.
+    """
+    DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+    IGNORED_PARAMS = {'_cb'}  # cache busters don't change the response
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.__max_bytes = max_bytes
+        self.__lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.__db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.__db.execute('PRAGMA journal_mode=WAL')
+        self.__db.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key         TEXT PRIMARY KEY,
+                endpoint    TEXT NOT NULL,
+                stored_at   REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                size        INTEGER NOT NULL,
+                body        BLOB NOT NULL
+            )
+        """)
+        self.__db.execute('CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)')
+        self.__total_bytes = self.__db.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+
+    @classmethod
+    def from_env(cls) -> 'ResponseCache | None':
+        """Create cache at HTTP_CACHE_PATH, bounded to HTTP_CACHE_MAX_MB. Returns None if caching is not configured."""
+        path = os.getenv('HTTP_CACHE_PATH')
+        if not path:
+            return None
+        max_mb = os.getenv('HTTP_CACHE_MAX_MB')
+
+        return cls(path, int(max_mb) * 1024 * 1024 if max_mb else cls.DEFAULT_MAX_BYTES)
+
+    @staticmethod
+    def get_key(url: str) -> str:
+        """Hash of the URL path and its sorted query parameters. JSON parameters (variables, extensions - which
+        include the persisted query hash) are re-serialized with sorted keys, so that equivalent requests match."""
+        parsed = urlparse(url)
+        params = []
+        for name, value in sorted(parse_qsl(parsed.query, keep_blank_values=True)):
+            if name in ResponseCache.IGNORED_PARAMS:
+                continue
+            if value[:1] in ('{', '['):
+                try:
+                    value = json.dumps(json.loads(value), sort_keys=True, separators=(',', ':'))
+                except ValueError:
+                    pass
+            params.append((name, value))
+
+        normalized = json.dumps([parsed.netloc, parsed.path, params], separators=(',', ':'))
+        return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+    def get(self, url: str, ttl: float) -> dict | None:
+        """Get cached response for url if it is not older than ttl seconds."""
+        key = self.get_key(url)
+        now = time()
+        with self.__lock:
+            row = self.__db.execute(
+                'SELECT body FROM responses WHERE key = ? AND stored_at >= ?', (key, now - ttl)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.__db.execute('UPDATE responses SET accessed_at = ? WHERE key = ?', (now, key))
+
+        return json.loads(zlib.decompress(row[0]))
+
+    def set(self, url: str, endpoint: str, response: dict):
+        key = self.get_key(url)
+        body = zlib.compress(json.dumps(response, separators=(',', ':')).encode('utf-8'))
+        now = time()
+        with self.__lock:
+            previous = self.__db.execute('SELECT size FROM responses WHERE key = ?', (key,)).fetchone()
+            self.__db.execute(
+                'INSERT OR REPLACE INTO responses (key, endpoint, stored_at, accessed_at, size, body) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (key, endpoint, now, now, len(body), body)
+            )
+            self.__total_bytes += len(body) - (previous[0] if previous else 0)
+            self.__evict()
+
+    def stats(self) -> dict:
+        with self.__lock:
+            n_entries = self.__db.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+
+        return {'hits': self.hits, 'misses': self.misses, 'entries': n_entries, 'bytes': self.__total_bytes}
+
+    def __evict(self):
+        """Delete least recently used entries until the cache fits in max_bytes. Must be called holding the lock."""
+        while self.__total_bytes > self.__max_bytes:
+            rows = self.__db.execute(
+                'SELECT key, size FROM responses ORDER BY accessed_at LIMIT 100').fetchall()
+            if not rows:
+                self.__total_bytes = 0
+                return
+            for key, size in rows:
+                if self.__total_bytes <= self.__max_bytes:
+                    return
+                self.__db.execute('DELETE FROM responses WHERE key = ?', (key,))
+                self.__total_bytes -= size
+
+    def close(self):
+        self.__db.close()
+
+
+class QuoteCache:
+    """Persistent cache of price quotes, keyed by (product id, checkin, checkout, currency).
+
+    Quotes are POST responses, so they can't be keyed by URL like `ResponseCache` entries. Quotes for windows that
+    have since been booked are removed with `invalidate`, and the least recently used quotes are evicted once more
+    than `max_entries` are stored.
+    """
+    DEFAULT_MAX_ENTRIES = 50000
+
+    def __init__(self, path: str, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.__max_entries = max_entries
+        self.__lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.__db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.__db.execute('PRAGMA journal_mode=WAL')
+        self.__db.execute("""
+            CREATE TABLE IF NOT EXISTS quotes (
+                product_id  TEXT NOT NULL,
+                checkin     TEXT NOT NULL,
+                checkout    TEXT NOT NULL,
+                currency    TEXT NOT NULL,
+                stored_at   REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                body        BLOB NOT NULL,
+                PRIMARY KEY (product_id, checkin, checkout, currency)
+            )
+        """)
+        self.__db.execute('CREATE INDEX IF NOT EXISTS quotes_accessed_at ON quotes (accessed_at)')
+        self.__n_entries = self.__db.execute('SELECT COUNT(*) FROM quotes').fetchone()[0]
+
+    @classmethod
+    def from_env(cls) -> 'QuoteCache | None':
+        """Create cache at PRICING_CACHE_PATH (default: HTTP_CACHE_PATH), bounded to PRICING_CACHE_MAX_ENTRIES.
+        Returns None if caching is not configured."""
+        path = os.getenv('PRICING_CACHE_PATH') or os.getenv('HTTP_CACHE_PATH')
+        if not path:
+            return None
+
+        return cls(path, int(os.getenv('PRICING_CACHE_MAX_ENTRIES', cls.DEFAULT_MAX_ENTRIES)))
+
+    def get(self, product_id: str, checkin: str, checkout: str, currency: str, ttl: float) -> dict | None:
+        """Get cached quote if it is not older than ttl seconds."""
+        key = (product_id, checkin, checkout, currency)
+        now = time()
+        with self.__lock:
+            row = self.__db.execute(
+                'SELECT body FROM quotes WHERE product_id = ? AND checkin = ? AND checkout = ? AND currency = ? '
+                'AND stored_at >= ?', key + (now - ttl,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.__db.execute(
+                'UPDATE quotes SET accessed_at = ? WHERE product_id = ? AND checkin = ? AND checkout = ? '
+                'AND currency = ?', (now,) + key)
+
+        return json.loads(zlib.decompress(row[0]))
+
+    def set(self, product_id: str, checkin: str, checkout: str, currency: str, quote: dict):
+        body = zlib.compress(json.dumps(quote, separators=(',', ':')).encode('utf-8'))
+        now = time()
+        with self.__lock:
+            cursor = self.__db.execute(
+                'INSERT OR IGNORE INTO quotes (product_id, checkin, checkout, currency, stored_at, accessed_at, body) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)', (product_id, checkin, checkout, currency, now, now, body))
+            if cursor.rowcount:
+                self.__n_entries += 1
+            else:
+                self.__db.execute(
+                    'UPDATE quotes SET stored_at = ?, accessed_at = ?, body = ? WHERE product_id = ? AND checkin = ? '
+                    'AND checkout = ? AND currency = ?', (now, now, body, product_id, checkin, checkout, currency))
+            self.__evict()
+
+    def invalidate(self, product_id: str, start: str, end: str) -> int:
+        """Delete quotes of a product for stays overlapping the nights from start (inclusive) to end (exclusive),
+        both ISO dates. Returns the number of deleted quotes."""
+        with self.__lock:
+            deleted = self.__db.execute(
+                'DELETE FROM quotes WHERE product_id = ? AND checkin < ? AND checkout > ?',
+                (product_id, end, start)).rowcount
+            self.__n_entries -= deleted
+
+        return deleted
+
+    def stats(self) -> dict:
+        return {'hits': self.hits, 'misses': self.misses, 'entries': self.__n_entries}
+
+    def __evict(self):
+        """Delete least recently used quotes until at most max_entries are left. Must be called holding the lock."""
+        excess = self.__n_entries - self.__max_entries
+        if excess > 0:
+            self.__db.execute(
+                'DELETE FROM quotes WHERE rowid IN (SELECT rowid FROM quotes ORDER BY accessed_at LIMIT ?)', (excess,))
+            self.__n_entries -= excess
+
+    def close(self):
+        self.__db.close()
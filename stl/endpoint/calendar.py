@@ -1,19 +1,37 @@
 import json
+import re
 import statistics
 
+from array import array
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import date, datetime, timedelta
 from itertools import groupby
 from logging import Logger
 from operator import itemgetter
 from requests.exceptions import ConnectionError
-from time import sleep
 
 from stl.endpoint.base_endpoint import BaseEndpoint
+from stl.endpoint.cache import QuoteCache, ResponseCache
 from stl.endpoint.pdp import Pdp
+from stl.endpoint.transport import HttpTransport
+from stl.exception.api import ApiException, ForbiddenException
 
 
 class Pricing(BaseEndpoint):
     API_PATH = '/api/v3/StayCheckoutSections'
+    QUOTE_TTL = 24 * 3600  # quotes for the same stay rarely change within a day
+
+    def __init__(
+            self,
+            api_key: str,
+            currency: str,
+            logger: Logger,
+            cors_api_key: str = '',
+            transport: HttpTransport = None,
+            quote_cache: QuoteCache = None
+    ):
+        super().__init__(api_key, currency, logger, cors_api_key, transport=transport)
+        self.__quote_cache = quote_cache
 
     def get_pricing(self, checkin: str, checkout: str, listing_id: str) -> dict:
         """Get pricing object for a listing for specific dates."""
@@ -21,7 +39,6 @@ class Pricing(BaseEndpoint):
         product_id = Pdp.get_product_id(listing_id)
         rates = self.get_rates(product_id, checkin, checkout)
         # sections = rates['data']['startStayCheckoutFlow']['stayCheckout']['sections']
-        print(rates)
         sections = rates['data']['presentation']['stayCheckout']['sections']
         if not (sections['temporaryQuickPayData'] and sections['temporaryQuickPayData']['bootstrapPaymentsJSON']):
             raise ValueError('Error retrieving pricing: {}'.format(
@@ -35,17 +52,49 @@ class Pricing(BaseEndpoint):
              datetime.strptime(checkin, '%Y-%m-%d')).days
         )
 
-    def get_rates(self, product_id: str, start_date: str, end_date: str):
-        """_summary_
+    def get_rates(self, product_id: str, start_date: str, end_date: str) -> dict:
+        """Get StayCheckoutSections response for a stay, from the quote cache if a fresh quote is available.
 
         Args:
-            product_id (str): _description_
-            start_date (str): _description_
-            end_date (str): _description_
+            product_id (str): Encoded listing id, see `Pdp.get_product_id`
+            start_date (str): Checkin date (YYYY-MM-DD)
+            end_date (str): Checkout date (YYYY-MM-DD)
 
         Returns:
-            _type_: _description_
+            dict: API response
         """
+        if self.__quote_cache:
+            rates = self.__quote_cache.get(product_id, start_date, end_date, self._currency, self.QUOTE_TTL)
+            if rates is not None:
+                return rates
+
+        rates = self.__request_rates(product_id, start_date, end_date)
+        if self.__quote_cache and self.__is_quote(rates):
+            self.__quote_cache.set(product_id, start_date, end_date, self._currency, rates)
+
+        return rates
+
+    def invalidate_booked(self, listing_id: str, booking_calendar: 'BookingCalendar'):
+        """Drop cached quotes for stays overlapping nights that have been booked since."""
+        if not self.__quote_cache:
+            return
+        product_id = Pdp.get_product_id(listing_id)
+        for date_range in booking_calendar.get_ranges('booked'):
+            self.__quote_cache.invalidate(
+                product_id, date_range['start'].isoformat(), date_range['end'].isoformat())
+
+    @staticmethod
+    def __is_quote(rates: dict) -> bool:
+        """Whether the response holds a price quote, rather than an error for an unavailable stay. Only quotes are
+        cached, so that stays becoming available again are not missed."""
+        try:
+            quickpay_data = rates['data']['presentation']['stayCheckout']['sections']['temporaryQuickPayData']
+        except (KeyError, TypeError):
+            return False
+
+        return bool(quickpay_data and quickpay_data['bootstrapPaymentsJSON'])
+
+    def __request_rates(self, product_id: str, start_date: str, end_date: str) -> dict:
         url = BaseEndpoint.build_airbnb_url(self.API_PATH, {
             'operationName': 'StayCheckoutSections',
             'locale':        self._locale,
@@ -157,20 +206,108 @@ class Pricing(BaseEndpoint):
         return pricing
 
 
+class BookingCalendar:
+    """Compact day-by-day booking calendar.
+
+    Days are stored from a start ordinal onwards, one byte of status per day (b'A'vailable, b'B'ooked, or e'X'cluded
+    from the calendar) and parallel arrays of min/max nights. Runs of days with the same status are found with a
+    regex scan over the status bytes instead of per-day date objects.
+    """
+    AVAILABLE = ord('A')
+    BOOKED = ord('B')
+    EXCLUDED = ord('X')
+    STATUS_PATTERNS = {'available': re.compile(b'A+'), 'booked': re.compile(b'B+')}
+
+    def __init__(self, start_ordinal: int, status: bytearray, min_nights: array, max_nights: array):
+        self.start_ordinal = start_ordinal
+        self.status = status
+        self.min_nights = min_nights
+        self.max_nights = max_nights
+
+    @classmethod
+    def from_calendar_months(cls, calendar_months: list) -> 'BookingCalendar':
+        days = [day for month_data in calendar_months for day in month_data['days']]
+        if not days:
+            return cls(date.today().toordinal(), bytearray(), array('I'), array('I'))
+
+        ordinals = [date.fromisoformat(day['calendarDate']).toordinal() for day in days]
+        start_ordinal = min(ordinals)
+        n_days = max(ordinals) - start_ordinal + 1
+        status = bytearray([cls.EXCLUDED]) * n_days  # days missing from the response stay excluded
+        min_nights = array('I', bytes(4 * n_days))
+        max_nights = array('I', bytes(4 * n_days))
+        for ordinal, day in zip(ordinals, days):
+            i = ordinal - start_ordinal
+            status[i] = cls.AVAILABLE if day['available'] else cls.BOOKED
+            min_nights[i] = day['minNights'] or 0
+            max_nights[i] = day['maxNights'] or 0
+
+        return cls(start_ordinal, status, min_nights, max_nights)
+
+    def __len__(self) -> int:
+        return len(self.status)
+
+    def get_ranges(self, status: str) -> list:
+        """Get date range objects for runs of "available" or "booked" days."""
+        if status not in self.STATUS_PATTERNS:
+            raise ValueError('status must be one of "available" or "booked"')
+
+        return [{
+            'start':  date.fromordinal(self.start_ordinal + match.start()),
+            'end':    date.fromordinal(self.start_ordinal + match.end()),
+            'length': match.end() - match.start(),
+        } for match in self.STATUS_PATTERNS[status].finditer(self.status)]
+
+    def exclude(self, start: date, length: int):
+        """Remove days from the calendar, so that they are neither available nor booked."""
+        i = start.toordinal() - self.start_ordinal
+        self.status[i:i + length] = bytes([self.EXCLUDED]) * length
+
+    def items(self):
+        """Iterate over (date string, is booked) for all days in the calendar, like a {date: is_booked} dict."""
+        for i, day_status in enumerate(self.status):
+            if day_status != self.EXCLUDED:
+                yield date.fromordinal(self.start_ordinal + i).isoformat(), day_status == self.BOOKED
+
+    def get_nights_modes(self) -> tuple:
+        """Get most common (min_nights, max_nights) over available days, or (None, None) without available days."""
+        available = [i for i in range(len(self.status)) if self.status[i] == self.AVAILABLE]
+        if not available:
+            return None, None
+
+        return (
+            statistics.mode(self.min_nights[i] for i in available),
+            statistics.mode(self.max_nights[i] for i in available)
+        )
+
+
 class Calendar(BaseEndpoint):
     API_PATH = '/api/v3/PdpAvailabilityCalendar'
+    CACHE_TTL = 3600  # availability changes with every booking
     N_MONTHS = 12  # number of months of data to return; 12 months == 1 year
+    PROBES_PER_LENGTH = 3  # candidate ranges priced at once for each length of stay, when probing concurrently
 
-    def __init__(self, api_key: str, currency: str, logger: Logger, pricing: Pricing):
-        super().__init__(api_key, currency, logger)
+    def __init__(
+            self,
+            api_key: str,
+            currency: str,
+            logger: Logger,
+            pricing: Pricing,
+            cors_api_key: str = '',
+            transport: HttpTransport = None,
+            cache: ResponseCache = None
+    ):
+        super().__init__(api_key, currency, logger, cors_api_key, transport=transport, cache=cache)
         self.__pricing = pricing
-        self.__today = datetime.today()
 
     @staticmethod
-    def get_date_ranges(status: str, booking_calendar: dict) -> list:
+    def get_date_ranges(status: str, booking_calendar: BookingCalendar | dict) -> list:
         """Given a booking calendar and a status of "available" or "booked", return a list of date range objects for
         either available or booked dates.
         """
+        if isinstance(booking_calendar, BookingCalendar):
+            return booking_calendar.get_ranges(status)
+
         allowed_status = ['available', 'booked']
         if status not in allowed_status:
             raise ValueError('status must be one of "available" or "booked"')
@@ -196,8 +333,10 @@ class Calendar(BaseEndpoint):
         url = self.get_url(listing_id)
 
         response_data = self._api_request(url)
+        booking_calendar, min_nights, max_nights = self.__get_booking_calendar(response_data)
+        self.__pricing.invalidate_booked(listing_id, booking_calendar)
 
-        return self.__get_booking_calendar(response_data)
+        return booking_calendar, min_nights, max_nights
 
     def get_rate_data(
             self,
@@ -205,46 +344,37 @@ class Calendar(BaseEndpoint):
             ranges: list,
             min_nights: int = None,
             max_nights: int = None,
-            full_data: bool = False
+            full_data: bool = False,
+            concurrency: int = 1
     ) -> dict:
-        test_lengths = self.__get_test_lengths(max_nights, min_nights)
+        if min_nights is None or max_nights is None:  # no available days to get pricing for
+            return {}
+        test_lengths = [
+            test_length for test_length in dict.fromkeys(self.__get_test_lengths(max_nights, min_nights))
+            if min_nights <= test_length <= max_nights
+        ]
+        # latest ranges first
+        candidates = {
+            test_length: [r for r in reversed(ranges) if r.get('length') >= test_length] for test_length in test_lengths
+        }
+        if concurrency > 1:
+            found = self.__probe_pricing_concurrently(listing_id, candidates, concurrency)
+        else:
+            found = {}
+            for test_length, test_ranges in candidates.items():
+                for test_range in test_ranges:
+                    pd = self.__probe_pricing(listing_id, test_range, test_length)
+                    if pd:
+                        found[test_length] = pd
+                        break
+
         pricing_data = {}
         for test_length in test_lengths:
-            if test_length > max_nights:
-                continue
-            if test_length < min_nights:
-                continue
-
-            possible_ranges = [
-                r for r in ranges if r.get('length') >= test_length]
-            pd = None
-            while possible_ranges and not pd:
-                test_range = possible_ranges.pop()
-                start_time = test_range['start'].strftime('%Y-%m-%d')
-                end_time = (
-                    test_range['start'] + timedelta(days=test_length)).strftime('%Y-%m-%d')
-                try:
-                    pd = self.__pricing.get_pricing(
-                        start_time, end_time, listing_id)
-                except (ValueError, RuntimeError) as e:
-                    # ValueError or Response error
-                    self._logger.error(
-                        '{}: Could not get pricing data: {}'.format(listing_id, str(e)))
-                    continue
-                except ConnectionError as e:
-                    self._logger.error(
-                        '{}: Could not get pricing data: {}'.format(listing_id, str(e)))
-                    # connection error due to network issues. wait for one minute for network connection to be
-                    # re-established.
-                    sleep(60)
-                    continue
-
-            if not pd:
+            if not found.get(test_length):
                 self._logger.warning(
                     '{}: Unable to find available {} day range'.format(listing_id, test_length))
                 continue
-
-            pricing_data[test_length] = pd
+            pricing_data[test_length] = found[test_length]
 
         if full_data or not pricing_data:
             return pricing_data
@@ -265,8 +395,60 @@ class Calendar(BaseEndpoint):
 
         return pricing_doc
 
+    def __probe_pricing(self, listing_id: str, test_range: dict, test_length: int) -> dict | None:
+        """Get pricing for a stay of test_length nights at the start of test_range, or None if it is unavailable."""
+        start_time = test_range['start'].strftime('%Y-%m-%d')
+        end_time = (test_range['start'] + timedelta(days=test_length)).strftime('%Y-%m-%d')
+        try:
+            return self.__pricing.get_pricing(start_time, end_time, listing_id)
+        except ForbiddenException:
+            raise
+        except (ValueError, RuntimeError, ApiException, ConnectionError) as e:
+            # ValueError or Response error; connection errors have already been retried with backoff by the endpoint
+            self._logger.error(
+                '{}: Could not get pricing data: {}'.format(listing_id, str(e)))
+            return None
+
+    def __probe_pricing_concurrently(self, listing_id: str, candidates: dict, concurrency: int) -> dict:
+        """Probe all stay lengths at once, up to PROBES_PER_LENGTH candidate ranges each. A failed probe is replaced
+        by the next candidate range of the same length; the first success for a length drops its other probes."""
+        found = {}
+        remaining = {test_length: iter(test_ranges) for test_length, test_ranges in candidates.items()}
+        pending = {}
+        executor = ThreadPoolExecutor(max_workers=concurrency)
+
+        def submit(test_length: int):
+            test_range = next(remaining[test_length], None)
+            if test_range is not None:
+                pending[executor.submit(self.__probe_pricing, listing_id, test_range, test_length)] = test_length
+
+        try:
+            for test_length in remaining:
+                for _ in range(self.PROBES_PER_LENGTH):
+                    submit(test_length)
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    test_length = pending.pop(future, None)
+                    if test_length is None:  # dropped after another probe for its length succeeded
+                        continue
+                    pd = future.result()
+                    if not pd:
+                        submit(test_length)
+                        continue
+                    found[test_length] = pd
+                    for other in [f for f, length in pending.items() if length == test_length]:
+                        other.cancel()
+                        del pending[other]
+        finally:
+            # probes already in flight can't be interrupted; don't wait for them
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        return found
+
     def get_url(self, listing_id: str) -> str:
         """Get PdpAvailabilityCalendar URL."""
+        today = datetime.today()
         query = {
             'operationName': 'PdpAvailabilityCalendar',
             'locale':        self._locale,
@@ -275,8 +457,8 @@ class Calendar(BaseEndpoint):
                 "request": {
                     'count':     self.N_MONTHS,
                     'listingId': listing_id,
-                    'month':     self.__today.month,
-                    'year':      self.__today.year
+                    'month':     today.month,
+                    'year':      today.year
                 }
             },
             'extensions':    {
@@ -314,36 +496,13 @@ class Calendar(BaseEndpoint):
 
     def __get_booking_calendar(self, data: dict) -> tuple:
         pdp_availability_calendar = data['data']['merlin']['pdpAvailabilityCalendar']
-        calendar_months = pdp_availability_calendar['calendarMonths']
-
-        booking_calendar = {}
-        min_nights_list = []
-        max_nights_list = []
-
-        for month_data in calendar_months:
-            for day in month_data['days']:
-                calendar_date = day['calendarDate']
-                date_obj = datetime.strptime(calendar_date, '%Y-%m-%d').date()
-
-                # Add data to booking_calendar
-                booking_calendar[date_obj] = {
-                    'available': day['available'],
-                    'maxNights': day['maxNights'],
-                    'minNights': day['minNights'],
-                    # ... any additional fields you need
-                }
-
-                # Collect min and max nights for all days
-                if day['available']:  # We may only want to consider available days
-                    min_nights_list.append(day['minNights'])
-                    max_nights_list.append(day['maxNights'])
+        booking_calendar = BookingCalendar.from_calendar_months(pdp_availability_calendar['calendarMonths'])
 
-        # Calculate the mode of the min_nights and max_nights, fallback to None if no available days
-        min_nights = statistics.mode(min_nights_list) if min_nights_list else None
-        max_nights = statistics.mode(max_nights_list) if max_nights_list else None
+        # Calculate the mode of the min_nights and max_nights of available days, fallback to None if no available days
+        min_nights, max_nights = booking_calendar.get_nights_modes()
 
         # Override with metadata if available
-        metadata = pdp_availability_calendar.get('metadata', {})
+        metadata = pdp_availability_calendar.get('metadata') or {}
         min_nights = metadata.get('constantMinNights', min_nights)
         max_nights = metadata.get('constantMaxNights', max_nights)
 
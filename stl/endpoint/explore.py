@@ -3,6 +3,10 @@ from stl.endpoint.base_endpoint import BaseEndpoint
 
 class Explore(BaseEndpoint):
     API_PATH = '/api/v3/ExploreSearch'
+    CACHE_TTL = 3600  # search results carry current prices
+    RESULT_CAP = 300  # a search returns at most 15 pages of 20 results, however many listings match
+    MIN_TILE_SIZE = 0.001  # degrees (~100m): map boxes are not split any further
+    MAP_BOX_PARAMS = ['neLat', 'neLng', 'swLat', 'swLng']
 
     def get_url(self, search_string: str, params: dict = None):
         query = {
@@ -50,6 +54,26 @@ class Explore(BaseEndpoint):
 
         return url
 
+    @staticmethod
+    def is_map_search(params: dict) -> bool:
+        return bool(params.get('searchByMap')) and all(params.get(key) for key in Explore.MAP_BOX_PARAMS)
+
+    @classmethod
+    def split_map(cls, params: dict) -> list:
+        """Split the searchByMap box of params into four quadrants. Returns no boxes if the box is too small."""
+        ne_lat, ne_lng, sw_lat, sw_lng = (float(params[key]) for key in cls.MAP_BOX_PARAMS)
+        if ne_lat - sw_lat < 2 * cls.MIN_TILE_SIZE and ne_lng - sw_lng < 2 * cls.MIN_TILE_SIZE:
+            return []
+        mid_lat = round((ne_lat + sw_lat) / 2, 6)
+        mid_lng = round((ne_lng + sw_lng) / 2, 6)
+
+        return [params | dict(zip(cls.MAP_BOX_PARAMS, box)) for box in [
+            (ne_lat, ne_lng, mid_lat, mid_lng),
+            (ne_lat, mid_lng, mid_lat, sw_lng),
+            (mid_lat, ne_lng, sw_lat, mid_lng),
+            (mid_lat, mid_lng, sw_lat, sw_lng),
+        ]]
+
     def search(self, url: str):
         data = self._api_request(url)
         pagination = data['data']['dora']['exploreV3']['metadata']['paginationMetadata']
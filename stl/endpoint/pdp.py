@@ -1,19 +1,65 @@
 import base64
+import hashlib
 import lxml.html
-import pycountry
+import os
 import re
 
+from dataclasses import dataclass, fields
 from datetime import datetime, timedelta
 from logging import Logger
 
 from stl.endpoint.base_endpoint import BaseEndpoint
+from stl.endpoint.cache import ResponseCache
+from stl.endpoint.transport import HttpTransport
 from stl.geo.geocode import Geocoder
+from stl.geo.places import is_country_or_subdivision
 
 import json
 
 
+@dataclass(slots=True)
+class ListingSummary:
+    """Listing data from a search result, to be combined with its PDP data. Kept for every listing of a search page
+    until the listing is parsed, hence slots instead of a dict per listing."""
+    avg_rating: float | None
+    bathrooms: float | None
+    bedrooms: int | None
+    beds: int | None
+    business_travel_ready: bool | None
+    city: str | None
+    host_id: str
+    latitude: float
+    longitude: float
+    name: str | None
+    neighborhood: str | None
+    neighborhood_overview: str | None
+    person_capacity: int | None
+    photo_count: int | None
+    review_count: int | None
+    room_and_property_type: str | None
+    room_type: str | None
+    room_type_category: str | None
+    star_rating: float | None
+    fingerprint: str = ''
+    price_rate: float | None = None
+    price_per_date: dict | None = None
+    price_cleaning: float | None = None
+    price_currency: str | None = None
+    price_rate_type: str | None = None
+
+    PRICE_FIELDS = ('price_rate', 'price_per_date', 'price_cleaning', 'price_currency', 'price_rate_type')
+
+    def to_dict(self) -> dict:
+        """Get listing fields, leaving out pricing if the search result had none."""
+        return {
+            field.name: getattr(self, field.name) for field in fields(self)
+            if field.name not in self.PRICE_FIELDS or getattr(self, field.name) is not None
+        }
+
+
 class Pdp(BaseEndpoint):
     API_PATH = '/api/v3/StaysPdpSections' # hardcoded
+    CACHE_TTL = 7 * 24 * 3600  # listing descriptions, amenities and rules rarely change
 
     AMENITIES = {
         1:    'tv',
@@ -74,10 +120,24 @@ class Pdp(BaseEndpoint):
 
     SECTION_NAMES = ['amenities', 'description',
                      'host_profile', 'location', 'policies']
-
-    def __init__(self, api_key: str, currency: str, logger: Logger, cors_api_key: str = ''):
-        super().__init__(api_key, currency, logger, cors_api_key)
-        self.__geocoder = Geocoder()
+    SECTION_IDS = {f'{name.upper()}_DEFAULT': name for name in SECTION_NAMES}
+
+    # search result fields that change along with the listing page: new reviews, photos or an edited title
+    FINGERPRINT_FIELDS = ['avg_rating', 'name', 'photo_count', 'review_count']
+
+    def __init__(
+            self,
+            api_key: str,
+            currency: str,
+            logger: Logger,
+            cors_api_key: str = '',
+            transport: HttpTransport = None,
+            cache: ResponseCache = None
+    ):
+        super().__init__(api_key, currency, logger, cors_api_key, transport=transport, cache=cache)
+        self.__geocoder = Geocoder.shared()
+        # reverse geocoding is rate limited to one request per second, only resolve ambiguous addresses if asked to
+        self.__reverse_geocode = os.getenv('REVERSE_GEOCODE', '').lower() in ('1', 'true', 'yes')
         self.__regex_amenity_id = re.compile(r'^([a-z0-9]+_)+([0-9]+)_')
 
     @staticmethod
@@ -87,12 +147,33 @@ class Pdp(BaseEndpoint):
     def get_listing(self, listing_id: str, data_cache: dict, geography: dict, reviews: list) -> dict:
         product_id = self.get_product_id(listing_id)
         response = self.get_raw_listing(listing_id)
-        return self.__parse_listing_contents(response, data_cache[listing_id], geography, reviews) | {
+        return self.parse_listing(response, data_cache[listing_id], geography, reviews) | {
             'product_id': product_id,
             'source':     self.SOURCE,
             'updated_at': datetime.utcnow(),
         }
 
+    def parse_listing(self, data: dict, summary: ListingSummary, geography: dict, reviews: list) -> dict:
+        """Parse a listing page, as returned by `get_raw_listing`. Empty if the page has no listing."""
+        return self.__parse_listing_contents(data, summary, geography, reviews)
+
+    @staticmethod
+    def carry_forward_listing(previous: dict, summary: ListingSummary) -> dict:
+        """Refresh a previously scraped listing with the data from search results, without fetching its PDP."""
+        return previous | summary.to_dict() | {
+            'coordinates': {
+                'lon': summary.longitude,
+                'lat': summary.latitude,
+            },
+            'updated_at': datetime.utcnow(),
+        }
+
+    @staticmethod
+    def get_fingerprint(summary: ListingSummary) -> str:
+        """Get hash of the search result fields a listing page change shows up in."""
+        values = [getattr(summary, field) for field in Pdp.FINGERPRINT_FIELDS]
+        return hashlib.sha1(json.dumps(values, default=str).encode('utf-8')).hexdigest()[:16]
+
     def get_raw_listing(self, listing_id: str) -> dict:
         url = self.__get_url(listing_id)
         return self._api_request(url)
@@ -121,38 +202,38 @@ class Pdp(BaseEndpoint):
         city, neighborhood = self.__determine_city_and_neighborhood(
             listing, geography)
 
-        data_cache[listing['id']] = {
+        summary = ListingSummary(
             # get general data
-            'avg_rating':             listing['avgRating'],
-            'bathrooms':              listing['bathrooms'],
-            'bedrooms':               listing['bedrooms'],
-            'beds':                   listing['beds'],
-            'business_travel_ready':  listing['isBusinessTravelReady'],
-            'city':                   city,
-            'host_id':                listing['user']['id'],
-            'latitude':               listing['lat'],
-            'longitude':              listing['lng'],
-            'name':                   listing['name'],
-            'neighborhood':           neighborhood,
-            'neighborhood_overview':  listing['neighborhoodOverview'],
-            'person_capacity':        listing['personCapacity'],
-            'photo_count':            listing['pictureCount'],
-            # 'photos':                 [p['picture'] for p in listing['contextualPictures']],
-            'review_count':           listing['reviewsCount'],
-            'room_and_property_type': listing['roomAndPropertyType'],
-            'room_type':              listing['roomType'],
-            'room_type_category':     listing['roomTypeCategory'],
-            'star_rating':            listing['starRating'],
-        }
+            avg_rating=listing['avgRating'],
+            bathrooms=listing['bathrooms'],
+            bedrooms=listing['bedrooms'],
+            beds=listing['beds'],
+            business_travel_ready=listing['isBusinessTravelReady'],
+            city=city,
+            host_id=listing['user']['id'],
+            latitude=listing['lat'],
+            longitude=listing['lng'],
+            name=listing['name'],
+            neighborhood=neighborhood,
+            neighborhood_overview=listing['neighborhoodOverview'],
+            person_capacity=listing['personCapacity'],
+            photo_count=listing['pictureCount'],
+            # photos=[p['picture'] for p in listing['contextualPictures']],
+            review_count=listing['reviewsCount'],
+            room_and_property_type=listing['roomAndPropertyType'],
+            room_type=listing['roomType'],
+            room_type_category=listing['roomTypeCategory'],
+            star_rating=listing['starRating'],
+        )
+        summary.fingerprint = self.get_fingerprint(summary)
         if pricing:
             # add pricing data
-            data_cache[listing['id']] |= {
-                'price_rate':           self.__get_price_rate(pricing),
-                'price_per_date':       self.__get_price_detail(pricing, checkin, checkout),
-                'price_cleaning':       self.__get_price_cleaning(pricing),
-                'price_currency':       self.__get_price_currency(pricing),
-                'price_rate_type':      self.__get_rate_type(pricing)
-            }
+            summary.price_rate = self.__get_price_rate(pricing)
+            summary.price_per_date = self.__get_price_detail(pricing, checkin, checkout)
+            summary.price_cleaning = self.__get_price_cleaning(pricing)
+            summary.price_currency = self.__get_price_currency(pricing)
+            summary.price_rate_type = self.__get_rate_type(pricing)
+        data_cache[listing['id']] = summary
 
     def __get_url(self, listing_id: str):
         query = {
@@ -230,10 +311,11 @@ class Pdp(BaseEndpoint):
         return self.__parse_pdp_data(data)['metadata']
 
     # # parse pdp logging data
-    def __parse_pdp_logging_data(self, data: dict) -> dict:
-        if self.__parse_pdp_metadata(data).get('loggingContext', None) is None:
+    @staticmethod
+    def __parse_pdp_logging_data(metadata: dict) -> dict | None:
+        if metadata.get('loggingContext', None) is None:
             return None
-        return self.__parse_pdp_metadata(data).get('loggingContext', {}).get('eventDataLogging', None)
+        return metadata['loggingContext'].get('eventDataLogging', None)
 
     # # parse pdp sections
     def __parse_pdp_subsections(self, data: dict) -> dict:
@@ -242,19 +324,15 @@ class Pdp(BaseEndpoint):
     # # parse section data
 
     def __parse_section_data(self, data: dict) -> dict:
-        # get data
-        sections = self.__parse_pdp_subsections(data)
-
-        # get section data
+        """Index the sections named in SECTION_NAMES by name, in a single pass over the sections. The first section
+        with a given id is kept; the others are skipped without being looked into."""
         section_data = {}
-
-        for section_name in self.SECTION_NAMES:
-            if detail_list := [
-                s
-                for s in sections
-                if s['sectionId'] == f'{section_name.upper()}_DEFAULT'
-            ]:
-                section_data[section_name] = detail_list[0]['section']
+        for section in self.__parse_pdp_subsections(data):
+            section_name = self.SECTION_IDS.get(section['sectionId'])
+            if section_name and section_name not in section_data:
+                section_data[section_name] = section['section']
+                if len(section_data) == len(self.SECTION_IDS):
+                    break
 
         return section_data
 
@@ -264,11 +342,11 @@ class Pdp(BaseEndpoint):
         # if amenities section exists
         if section_data.get('amenities'):
             # Collect amenity group data
-            amenities_groups = section_data['amenities']['seeAllAmenitiesGroups']
-            amenities_access = [g['amenities']
-                                for g in amenities_groups if g['title'] == 'Guest access']
-            amenities_avail = [
-                amenity for g in amenities_groups for amenity in g['amenities'] if amenity['available']]
+            amenities_access, amenities_avail = [], []
+            for group in section_data['amenities']['seeAllAmenitiesGroups']:
+                if group['title'] == 'Guest access':
+                    amenities_access.append(group['amenities'])
+                amenities_avail.extend(amenity for amenity in group['amenities'] if amenity['available'])
         else:
             amenities_access = amenities_avail = []
 
@@ -303,9 +381,20 @@ class Pdp(BaseEndpoint):
             else ''
         )
 
-    def __parse_listing_contents(self, data: dict, listing_data_cached: dict, geography: dict, reviews: dict) -> dict:
+    def __parse_listing_contents(self, data: dict, summary: ListingSummary, geography: dict, reviews: dict) -> dict:
         """Obtain data from an individual listing page, combine with cached data, and return dict."""
 
+        # # metadata -> bookingPrefetchData, listingId
+
+        metadata = self.__parse_pdp_metadata(data)
+
+        # # logging data -> ratings
+        logging_data = self.__parse_pdp_logging_data(metadata)
+        if logging_data is None:
+            return {}  # nothing to combine the sections with, skip parsing them
+
+        listing_id = logging_data['listingId']
+
         # parsed data
 
         # # section data -> amenities, house rules, description
@@ -319,17 +408,6 @@ class Pdp(BaseEndpoint):
 
         description = self.__parse_description(section_data)
 
-        # # metadata -> bookingPrefetchData, listingId
-
-        metadata = self.__parse_pdp_metadata(data)
-
-        # # logging data -> ratings
-        logging_data = self.__parse_pdp_logging_data(data)
-        if logging_data is None:
-            return {}
-
-        listing_id = logging_data['listingId']
-
         # # reviews
         # reviews = self.__get_reviews(listing_id)
 
@@ -349,42 +427,39 @@ class Pdp(BaseEndpoint):
             'amenities': self.__render_titles(
                 amenities_avail, sep=' - ', join=False
             ),
-            'avg_rating': listing_data_cached['avg_rating'],
-            'bathrooms': listing_data_cached['bathrooms'],
-            'bedrooms': listing_data_cached['bedrooms'],
-            'beds': listing_data_cached['beds'],
-            'business_travel_ready': listing_data_cached['business_travel_ready'],
+            'avg_rating': summary.avg_rating,
+            'bathrooms': summary.bathrooms,
+            'bedrooms': summary.bedrooms,
+            'beds': summary.beds,
+            'business_travel_ready': summary.business_travel_ready,
             'can_instant_book': metadata['bookingPrefetchData']['canInstantBook'],
-            'city': listing_data_cached.get('city', geography['city']),
+            'city': summary.city,
             'coordinates': {
-                'lon': listing_data_cached['longitude'],
-                'lat': listing_data_cached['latitude'],
+                'lon': summary.longitude,
+                'lat': summary.latitude,
             },
             'country': geography['country'],
             'description': description,
-            'host_id': listing_data_cached['host_id'],
+            'fingerprint': summary.fingerprint,
+            'host_id': summary.host_id,
             'house_rules': house_rules,
             'is_hotel': metadata['bookingPrefetchData']['isHotelRatePlanEnabled'],
-            'latitude': listing_data_cached['latitude'],
+            'latitude': summary.latitude,
             'listing_expectations': listing_expectations,
-            'longitude': listing_data_cached['longitude'],
-            'monthly_price_factor': listing_data_cached.get(
-                'monthly_price_factor'
-            ),
-            'name': listing_data_cached.get('name', listing_id),
-            'neighborhood': listing_data_cached.get('neighborhood'),
-            'neighborhood_overview': listing_data_cached.get(
-                'neighborhood_overview'
-            ),
-            'person_capacity': listing_data_cached['person_capacity'],
-            'photo_count': listing_data_cached['photo_count'],
-            # 'photos': listing_data_cached['photos'],
+            'longitude': summary.longitude,
+            'monthly_price_factor': None,  # not in search results
+            'name': summary.name,
+            'neighborhood': summary.neighborhood,
+            'neighborhood_overview': summary.neighborhood_overview,
+            'person_capacity': summary.person_capacity,
+            'photo_count': summary.photo_count,
+            # 'photos': summary.photos,
             'place_id': geography['placeId'],
-            'price_rate': listing_data_cached.get('price_rate'),
-            'price_per_date': listing_data_cached.get('price_per_date'),
-            'price_cleaning': listing_data_cached.get('price_cleaning'),
-            'price_currency': listing_data_cached.get('price_currency'),
-            'price_rate_type': listing_data_cached.get('price_rate_type'),
+            'price_rate': summary.price_rate,
+            'price_per_date': summary.price_per_date,
+            'price_cleaning': summary.price_cleaning,
+            'price_currency': summary.price_currency,
+            'price_rate_type': summary.price_rate_type,
             'province': geography.get('province'),
             'rating_accuracy': logging_data.get('accuracyRating', None),
             'rating_checkin': logging_data.get('checkinRating', None),
@@ -392,19 +467,17 @@ class Pdp(BaseEndpoint):
             'rating_communication': logging_data.get('communicationRating', None),
             'rating_location': logging_data.get('locationRating', None),
             'rating_value': logging_data.get('valueRating', None),
-            'review_count': listing_data_cached['review_count'],
+            'review_count': summary.review_count,
             'reviews': reviews,
-            'room_and_property_type': listing_data_cached[
-                'room_and_property_type'
-            ],
-            'room_type': listing_data_cached['room_type'],
-            'room_type_category': listing_data_cached['room_type_category'],
+            'room_and_property_type': summary.room_and_property_type,
+            'room_type': summary.room_type,
+            'room_type_category': summary.room_type_category,
             'satisfaction_guest': logging_data.get('guestSatisfactionOverall', None),
-            'star_rating': listing_data_cached['star_rating'],
+            'star_rating': summary.star_rating,
             'state': geography['state'],
-            #'total_price': listing_data_cached.get('total_price'),
+            #'total_price': summary.total_price,
             'url': f"https://www.airbnb.com/rooms/{listing_id}",
-            'weekly_price_factor': listing_data_cached.get('weekly_price_factor'),
+            'weekly_price_factor': None,  # not in search results
         }
 
         self.__get_detail_property(
@@ -447,13 +520,9 @@ class Pdp(BaseEndpoint):
                 address_city = component
             elif component == localized_neighborhood:
                 address_neighborhood = component
-            else:
-                try:
-                    result = pycountry.countries.lookup(
-                        component) or pycountry.subdivisions.lookup(component)
-                    continue  # skip countries and state/province subdivisions
-                except LookupError:
-                    unknown_components.append(component)
+            elif component in (city, localized_city) or not is_country_or_subdivision(component, geography['country']):
+                # skip countries and state/province subdivisions, unless named like the listing's city (e.g. Berlin)
+                unknown_components.append(component)
 
         if address_city and localized_neighborhood:
             return address_city, localized_neighborhood
@@ -467,18 +536,23 @@ class Pdp(BaseEndpoint):
             elif address_city:
                 address_neighborhood = unknown_components.pop()
 
-        return city, neighborhood
-    
+        if not self.__reverse_geocode:
+            return city, neighborhood
+
         reverse_geo_address = self.__geocoder.reverse(
             listing['lat'], listing['lng'])
+        if not reverse_geo_address:
+            return city, neighborhood
 
-        if reverse_geo_address and 'city' in reverse_geo_address:
-            if reverse_geo_address['city'] in [search_city, city, localized_city] or self.__geocoder.is_city(reverse_geo_address['city'], reverse_geo_address['country']):
-                return reverse_geo_address['city'], localized_neighborhood
+        country = reverse_geo_address.get('country')
+        if reverse_geo_address['city'] in [search_city, city, localized_city] or self.__geocoder.is_city(
+                reverse_geo_address['city'], country):
+            return reverse_geo_address['city'], localized_neighborhood
 
-        if self.__geocoder.is_city((city or localized_city), reverse_geo_address['country']):
+        if (city or localized_city) and self.__geocoder.is_city(city or localized_city, country):
             return city or localized_city, neighborhood
 
+        return city, neighborhood
 
     def __get_amenity_ids(self, amenities: list):
         """Extract amenity id from `id` string field."""
@@ -488,11 +562,8 @@ class Pdp(BaseEndpoint):
 
     def __get_detail_property(self, item: dict, prop: str, title: str, prop_list: list, key: str):
         """Search for matching title in property list for prop. If exists, add htmlText for key to item."""
-        if title in [i['title'] for i in prop_list]:
-            item[prop] = self.__html_to_text(
-                [i[key]['htmlText'] for i in prop_list if i['title'] == title][0])
-        else:
-            item[prop] = None
+        html = next((i[key]['htmlText'] for i in prop_list if i['title'] == title), None)
+        item[prop] = self.__html_to_text(html) if html is not None else None
 
     @staticmethod
     def __capitalize_first(name: str | None) -> str:
@@ -573,7 +644,7 @@ class Pdp(BaseEndpoint):
     @staticmethod
     def extract_first_digit_group(string: str) -> int:
         # Find all non-empty sequences of digits and return the first one as integer
-        match = re.search('\d+', string.replace(',', ''))
+        match = re.search(r'\d+', string.replace(',', ''))
         if match:
             return int(match.group())
         else:
@@ -696,10 +767,9 @@ class Pdp(BaseEndpoint):
     @staticmethod
     def __render_titles(title_list: list, sep: str = ': ', join: bool = True) -> str | list:
         """Render list of objects with titles and subtitles into string."""
-        lines = []
-        for t in title_list:
-            line = '{}{}{}'.format(t['title'], sep, t['subtitle']) if t.get(
-                'subtitle') else t.get('title')
-            lines.append(line)
+        lines = [
+            '{}{}{}'.format(t['title'], sep, t['subtitle']) if t.get('subtitle') else t.get('title')
+            for t in title_list
+        ]
 
         return '\n'.join(lines) if join else lines
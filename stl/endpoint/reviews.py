@@ -1,38 +1,68 @@
-import json
-import requests
+from concurrent.futures import ThreadPoolExecutor
 
 from stl.endpoint.base_endpoint import BaseEndpoint
 
 
 class Reviews(BaseEndpoint):
     API_PATH = '/api/v3/PdpReviews'
+    CACHE_TTL = 24 * 3600
+
+    def get_reviews(
+            self,
+            listing_id: str,
+            limit: int = 50,
+            start_offset: int = 0,
+            since: str = None,
+            concurrency: int = 1
+    ) -> list:
+        """Get reviews of a listing, most recent first.
+
+        With `since` (a `created_at` value), only reviews created after it are fetched, page by page until an older
+        review shows up. Otherwise, once the first page gives the total number of reviews, the remaining pages are
+        fetched `concurrency` at a time.
+        """
+        if since:
+            return self.__get_reviews_since(listing_id, limit, since)
 
-    def get_reviews(self, listing_id: str, limit: int = 50, start_offset: int = 0):
-        """Perform API request."""
         # get first batch of reviews
         reviews, n_reviews_total = self.__get_reviews_batch(listing_id, limit, start_offset)
 
         # get any additional batches
-        start_idx = start_offset + limit
-        for offset in range(start_idx, n_reviews_total, limit):
-            r, _ = self.__get_reviews_batch(listing_id, limit, offset)
-            reviews.extend(r)
+        offsets = range(start_offset + limit, n_reviews_total, limit)
+        if concurrency > 1 and len(offsets) > 1:
+            with ThreadPoolExecutor(max_workers=min(concurrency, len(offsets))) as executor:
+                batches = executor.map(lambda offset: self.__get_reviews_batch(listing_id, limit, offset), offsets)
+                for batch, _ in batches:
+                    reviews.extend(batch)
+        else:
+            for offset in offsets:
+                batch, _ = self.__get_reviews_batch(listing_id, limit, offset)
+                reviews.extend(batch)
 
         return reviews
 
+    def __get_reviews_since(self, listing_id: str, limit: int, since: str) -> list:
+        reviews = []
+        offset = 0
+        while True:
+            batch, n_reviews_total = self.__get_reviews_batch(listing_id, limit, offset)
+            new_reviews = [r for r in batch if r['created_at'] > since]
+            reviews.extend(new_reviews)
+            offset += limit
+            if len(new_reviews) < len(batch) or offset >= n_reviews_total:
+                return reviews
+
     def __get_reviews_batch(self, listing_id: str, limit: int, offset: int):
         """Get reviews for a given listing ID in batches."""
         url = self.__get_url(listing_id, limit, offset)
-        headers = {'x-airbnb-api-key': self._api_key}
-        response = requests.get(url, headers=headers)
-        data = json.loads(response.text)
+        data = self._api_request(url)
         pdp_reviews = data['data']['merlin']['pdpReviews']
         if isinstance(pdp_reviews, dict):
             n_reviews_total = (
                 int(pdp_reviews['metadata']['reviewsCount'])
             ) if pdp_reviews.get('metadata') else len(pdp_reviews['reviews'])
         else:
-            n_reviews_total = 0
+            return [], 0
 
         reviews = [{
             'comments':   r['comments'],
@@ -51,12 +81,13 @@ class Reviews(BaseEndpoint):
             'currency':      self._currency,
             'variables':     {
                 'request': {
-                    'fieldSelector':    'for_p3',
-                    'limit':            limit,
-                    'listingId':        listing_id,
-                    'numberOfAdults':   '1',
-                    'numberOfChildren': '0',
-                    'numberOfInfants':  '0'
+                    'fieldSelector':     'for_p3',
+                    'limit':             limit,
+                    'listingId':         listing_id,
+                    'numberOfAdults':    '1',
+                    'numberOfChildren':  '0',
+                    'numberOfInfants':   '0',
+                    'sortingPreference': 'MOST_RECENT',  # stable pages, and new reviews first
                 }
             },
             'extensions':    {
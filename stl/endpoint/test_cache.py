@@ -0,0 +1,63 @@
+import pytest
+
+from stl.endpoint.cache import QuoteCache, ResponseCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResponseCache(str(tmp_path / 'responses.sqlite'))
+
+
+def test_key_ignores_param_order_json_spacing_and_cache_buster():
+    a = 'https://www.airbnb.com/api/v3/ExploreSearch?operationName=ExploreSearch&_cb=abc' \
+        '&variables={"request":{"query":"Rome","itemsPerGrid":20}}'
+    b = 'https://www.airbnb.com/api/v3/ExploreSearch?variables={"request": {"itemsPerGrid": 20, "query": "Rome"}}' \
+        '&operationName=ExploreSearch&_cb=xyz'
+    c = 'https://www.airbnb.com/api/v3/ExploreSearch?operationName=ExploreSearch' \
+        '&variables={"request":{"query":"Madrid","itemsPerGrid":20}}'
+    assert ResponseCache.get_key(a) == ResponseCache.get_key(b)
+    assert ResponseCache.get_key(a) != ResponseCache.get_key(c)
+
+
+def test_get_respects_ttl_and_counts(cache):
+    url = 'https://www.airbnb.com/api/v3/PdpReviews?x=1'
+    assert cache.get(url, 60) is None
+    cache.set(url, '/api/v3/PdpReviews', {'data': {'n': 1}})
+    assert cache.get(url, 60) == {'data': {'n': 1}}
+    assert cache.get(url, -1) is None  # stale
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = ResponseCache(str(tmp_path / 'responses.sqlite'), max_bytes=2000)
+    payload = {'data': [str(i) * 10 for i in range(100)]}
+    for i in range(20):
+        cache.set('https://x/?i=%d' % i, 'test', payload | {'i': i})
+    stats = cache.stats()
+    assert 0 < stats['entries'] < 20
+    assert stats['bytes'] <= 2000
+    assert cache.get('https://x/?i=19', 60) is not None
+    assert cache.get('https://x/?i=0', 60) is None
+
+
+def test_quote_cache_invalidates_overlapping_stays(tmp_path):
+    quotes = QuoteCache(str(tmp_path / 'quotes.sqlite'))
+    quotes.set('p1', '2024-03-01', '2024-03-08', 'USD', {'n': 7})
+    quotes.set('p1', '2024-03-10', '2024-03-12', 'USD', {'n': 2})
+    quotes.set('p2', '2024-03-01', '2024-03-08', 'USD', {'n': 7})
+    assert quotes.get('p1', '2024-03-01', '2024-03-08', 'USD', 60) == {'n': 7}
+    assert quotes.get('p1', '2024-03-01', '2024-03-08', 'EUR', 60) is None
+    # nights of 2024-03-07 and 2024-03-08 booked: only the first stay of p1 overlaps
+    assert quotes.invalidate('p1', '2024-03-07', '2024-03-09') == 1
+    assert quotes.get('p1', '2024-03-01', '2024-03-08', 'USD', 60) is None
+    assert quotes.get('p1', '2024-03-10', '2024-03-12', 'USD', 60) == {'n': 2}
+    assert quotes.get('p2', '2024-03-01', '2024-03-08', 'USD', 60) == {'n': 7}
+
+
+def test_quote_cache_evicts_least_recently_used(tmp_path):
+    quotes = QuoteCache(str(tmp_path / 'quotes.sqlite'), max_entries=3)
+    for day in range(1, 6):
+        quotes.set('p1', '2024-03-0%d' % day, '2024-03-1%d' % day, 'USD', {'day': day})
+    assert quotes.stats()['entries'] == 3
+    assert quotes.get('p1', '2024-03-01', '2024-03-11', 'USD', 60) is None
+    assert quotes.get('p1', '2024-03-05', '2024-03-15', 'USD', 60) == {'day': 5}
@@ -0,0 +1,63 @@
+import logging
+
+from datetime import date
+
+from stl.endpoint.calendar import BookingCalendar, Calendar
+
+
+def get_calendar_months(availability: str, first_day: date = date(2024, 1, 30)) -> list:
+    """Build a calendarMonths response from a string of A(vailable)/B(ooked) days."""
+    days = [{
+        'calendarDate': date.fromordinal(first_day.toordinal() + i).isoformat(),
+        'available':    status == 'A',
+        'minNights':    2,
+        'maxNights':    30 if status == 'A' else 1125,
+    } for i, status in enumerate(availability)]
+
+    return [{'days': days[:2]}, {'days': days[2:]}]
+
+
+def test_booking_calendar_ranges():
+    calendar = BookingCalendar.from_calendar_months(get_calendar_months('AABBBAB'))
+    assert len(calendar) == 7
+    assert calendar.get_ranges('available') == [
+        {'start': date(2024, 1, 30), 'end': date(2024, 2, 1), 'length': 2},
+        {'start': date(2024, 2, 4), 'end': date(2024, 2, 5), 'length': 1},
+    ]
+    assert calendar.get_ranges('booked') == Calendar.get_date_ranges('booked', dict(calendar.items()))
+    assert calendar.get_nights_modes() == (2, 30)
+
+
+def test_booking_calendar_exclude():
+    calendar = BookingCalendar.from_calendar_months(get_calendar_months('ABBBA'))
+    calendar.exclude(date(2024, 1, 31), 3)
+    assert calendar.get_ranges('booked') == []
+    assert list(calendar.items()) == [('2024-01-30', False), ('2024-02-03', False)]
+
+
+class FakePricing:
+    """Pricing endpoint stub, only available for stays starting on given days."""
+
+    def __init__(self, available_checkins: set):
+        self.available_checkins = available_checkins
+
+    def get_pricing(self, checkin: str, checkout: str, listing_id: str) -> dict:
+        if checkin not in self.available_checkins:
+            raise ValueError('Error retrieving pricing: unavailable')
+        nights = (date.fromisoformat(checkout) - date.fromisoformat(checkin)).days
+        return {'price_nightly': 100, 'price_cleaning': 50, 'nights': nights}
+
+
+def test_get_rate_data_serial_and_concurrent_agree():
+    ranges = [
+        {'start': date(2024, 3, 1), 'end': date(2024, 4, 1), 'length': 31},
+        {'start': date(2024, 5, 1), 'end': date(2024, 5, 10), 'length': 9},
+        {'start': date(2024, 6, 1), 'end': date(2024, 6, 3), 'length': 2},
+    ]
+    results = []
+    for concurrency in (1, 4):
+        pricing = FakePricing({'2024-03-01', '2024-05-01'})
+        calendar = Calendar('api_key', 'USD', logging.getLogger(__name__), pricing)
+        results.append(calendar.get_rate_data('1', ranges, 2, 1125, True, concurrency))
+    assert results[0] == results[1]
+    assert {length: pd['nights'] for length, pd in results[0].items()} == {2: 2, 7: 7, 28: 28}
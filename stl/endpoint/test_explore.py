@@ -0,0 +1,20 @@
+from stl.endpoint.explore import Explore
+
+
+def test_split_map_into_quadrants():
+    params = {'searchByMap': 'true', 'neLat': '41', 'neLng': '-73', 'swLat': '40', 'swLng': '-74', 'priceMax': 100}
+    assert Explore.is_map_search(params)
+    tiles = Explore.split_map(params)
+    assert [[tile[key] for key in Explore.MAP_BOX_PARAMS] for tile in tiles] == [
+        [41.0, -73.0, 40.5, -73.5],
+        [41.0, -73.5, 40.5, -74.0],
+        [40.5, -73.0, 40.0, -73.5],
+        [40.5, -73.5, 40.0, -74.0],
+    ]
+    assert all(tile['priceMax'] == 100 and tile['searchByMap'] == 'true' for tile in tiles)
+
+
+def test_split_map_stops_at_min_tile_size():
+    params = {'searchByMap': 'true', 'neLat': 40.0015, 'neLng': -73.9985, 'swLat': 40.0, 'swLng': -74.0}
+    assert Explore.split_map(params) == []
+    assert not Explore.is_map_search({'neLat': '41', 'neLng': '-73', 'swLat': '40', 'swLng': '-74'})
@@ -0,0 +1,94 @@
+from stl.endpoint.pdp import ListingSummary, Pdp
+
+
+def make_summary(**fields) -> ListingSummary:
+    return ListingSummary(**{
+        'avg_rating': 4.9, 'bathrooms': 1.0, 'bedrooms': 1, 'beds': 2, 'business_travel_ready': False, 'city': 'Rome',
+        'host_id': '7', 'latitude': 41.9, 'longitude': 12.5, 'name': 'Listing 1', 'neighborhood': None,
+        'neighborhood_overview': None, 'person_capacity': 2, 'photo_count': 20, 'review_count': 31,
+        'room_and_property_type': 'Entire rental unit', 'room_type': 'Entire home/apt',
+        'room_type_category': 'entire_home', 'star_rating': None,
+    } | fields)
+
+
+def test_carry_forward_keeps_saved_pricing_if_search_result_has_none():
+    previous = {'id': '1', 'description': 'Nice', 'review_count': 30, 'price_rate': 80, 'price_currency': 'EUR'}
+    listing = Pdp.carry_forward_listing(previous, make_summary())
+    assert (listing['description'], listing['review_count'], listing['price_rate']) == ('Nice', 31, 80)
+    assert listing['coordinates'] == {'lon': 12.5, 'lat': 41.9}
+
+    listing = Pdp.carry_forward_listing(previous, make_summary(price_rate=95, price_currency='EUR'))
+    assert listing['price_rate'] == 95
+
+
+def test_fingerprint_changes_with_review_count():
+    assert Pdp.get_fingerprint(make_summary()) == Pdp.get_fingerprint(make_summary(neighborhood='Trastevere'))
+    assert Pdp.get_fingerprint(make_summary()) != Pdp.get_fingerprint(make_summary(review_count=32))
+
+
+def test_parse_listing_uses_first_section_of_each_kind():
+    sections = [
+        {'sectionId': 'REVIEWS_DEFAULT', 'section': {}},
+        {'sectionId': 'AMENITIES_DEFAULT', 'section': {'seeAllAmenitiesGroups': [
+            {'title': 'Guest access', 'amenities': [{'title': 'Pool', 'subtitle': 'Shared', 'available': True}]},
+            {'title': 'Basics', 'amenities': [{'title': 'Wifi', 'available': True}, {'title': 'TV', 'available': False}]},
+        ]}},
+        {'sectionId': 'POLICIES_DEFAULT', 'section': {'houseRules': [{'title': 'No parties or events'}]}},
+        {'sectionId': 'LOCATION_DEFAULT', 'section': {'seeAllLocationDetails': [
+            {'title': 'Getting around', 'content': {'htmlText': '<p>Metro <b>B</b></p>'}}]}},
+        {'sectionId': 'AMENITIES_DEFAULT', 'section': {'seeAllAmenitiesGroups': []}},
+    ]
+    data = {'data': {'presentation': {'stayProductDetailPage': {'sections': {
+        'metadata': {'bookingPrefetchData': {'canInstantBook': True, 'isHotelRatePlanEnabled': False},
+                     'loggingContext': {'eventDataLogging': {'listingId': '1'}}},
+        'sections': sections,
+    }}}}}
+    pdp = Pdp('', 'USD', None)
+    geography = {'city': 'Rome', 'country': 'Italy', 'placeId': 'p', 'state': 'Lazio'}
+    listing = pdp.parse_listing(data, make_summary(), geography, [])
+    assert (listing['access'], listing['amenities']) == ('Pool: Shared', ['Pool - Shared', 'Wifi'])
+    assert listing['allows_events'] and listing['transit'] == 'Metro B'
+    assert listing['description'] == '' and 'interaction' not in listing
+
+    del data['data']['presentation']['stayProductDetailPage']['sections']['metadata']['loggingContext']
+    assert pdp.parse_listing(data, make_summary(), geography, []) == {}
+
+
+def make_listing(public_address: str, city: str, neighborhood: str = None) -> dict:
+    return {'publicAddress': public_address, 'city': city, 'localizedCity': city, 'neighborhood': neighborhood,
+            'localizedNeighborhood': neighborhood}
+
+
+def test_city_named_like_a_subdivision_is_kept():
+    pdp = Pdp('', 'USD', None)
+    determine = pdp._Pdp__determine_city_and_neighborhood
+    geography = {'city': 'Potsdam', 'country': 'Germany'}
+    assert determine(make_listing('Mitte, Berlin, Germany', 'Berlin', 'Mitte'), geography) == ('Berlin', 'Mitte')
+
+    geography = {'city': 'Los Angeles', 'country': 'United States'}
+    listing = make_listing('Los Angeles, California, United States', 'Hollywood')
+    assert determine(listing, geography) == ('Los Angeles', None)  # California skipped as a state
+
+
+class FakeGeocoder:
+    def __init__(self, address):
+        self.address = address
+
+    def reverse(self, lat: float, lon: float):
+        return self.address
+
+    def is_city(self, name: str, country: str) -> bool:
+        return name == 'Santa Monica'
+
+
+def test_ambiguous_address_is_reverse_geocoded_if_enabled(monkeypatch):
+    monkeypatch.setenv('REVERSE_GEOCODE', '1')
+    pdp = Pdp('', 'USD', None)
+    determine = pdp._Pdp__determine_city_and_neighborhood
+    geography = {'city': 'Los Angeles', 'country': 'United States'}
+    listing = make_listing('Ocean Park, Main Street, United States', 'Ocean park') | {'lat': 34.0, 'lng': -118.5}
+
+    pdp._Pdp__geocoder = FakeGeocoder({'city': 'Santa Monica', 'country': 'United States'})
+    assert determine(listing, geography) == ('Santa Monica', None)
+    pdp._Pdp__geocoder = FakeGeocoder(False)  # no address found
+    assert determine(listing, geography) == ('Ocean park', None)
@@ -0,0 +1,40 @@
+import json
+import logging
+
+from urllib.parse import parse_qs, urlparse
+
+from stl.endpoint.reviews import Reviews
+
+CREATED_AT = ['2024-01-{:02d}T12:00:00Z'.format(day) for day in range(28, 0, -1)]  # most recent first
+
+
+class FakeReviews(Reviews):
+    """Reviews endpoint answering from CREATED_AT instead of the API."""
+
+    def __init__(self):
+        super().__init__('api_key', 'USD', logging.getLogger(__name__))
+        self.offsets = []
+
+    def _api_request(self, url: str, method: str = 'GET', data=None) -> dict:
+        request = json.loads(parse_qs(urlparse(url).query)['variables'][0])['request']
+        offset = request.get('offset', 0)
+        self.offsets.append(offset)
+        return {'data': {'merlin': {'pdpReviews': {
+            'metadata': {'reviewsCount': len(CREATED_AT)},
+            'reviews':  [{
+                'comments':  'Nice', 'createdAt': created_at, 'language': 'en', 'rating': 5, 'response': None,
+            } for created_at in CREATED_AT[offset:offset + request['limit']]],
+        }}}}
+
+
+def test_get_all_reviews_concurrently_in_order():
+    reviews = FakeReviews()
+    assert [r['created_at'] for r in reviews.get_reviews('1', limit=5, concurrency=4)] == CREATED_AT
+    assert sorted(reviews.offsets) == list(range(0, 28, 5))
+
+
+def test_get_reviews_since_stops_at_first_older_review():
+    reviews = FakeReviews()
+    new_reviews = reviews.get_reviews('1', limit=5, since='2024-01-21T12:00:00Z')
+    assert [r['created_at'] for r in new_reviews] == CREATED_AT[:7]
+    assert reviews.offsets == [0, 5]
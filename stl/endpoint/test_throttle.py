@@ -0,0 +1,30 @@
+from stl.endpoint.throttle import RateLimiter, TokenBucket
+
+
+def test_token_bucket_aimd():
+    bucket = TokenBucket(max_rate=4, min_rate=1, increase=0.5, decrease=0.5)
+    bucket.on_throttle()
+    assert bucket.rate == 2
+    bucket.on_throttle()
+    bucket.on_throttle()
+    assert bucket.rate == 1  # never below min_rate
+    bucket.on_success()
+    assert bucket.rate == 1.5
+    for _ in range(10):
+        bucket.on_success()
+    assert bucket.rate == 4  # never above max_rate
+
+
+def test_rate_limiter_buckets_per_host():
+    limiter = RateLimiter(max_rate=5)
+    a = limiter.bucket('https://a.example.com/api/v3/ExploreSearch?x=1')
+    assert limiter.bucket('https://a.example.com/api/v3/StaysPdpSections') is a
+    assert limiter.bucket('https://b.example.com/') is not a
+
+
+def test_backoff_is_jittered_and_capped():
+    for attempt in range(1, 20):
+        delay = RateLimiter.backoff(attempt)
+        assert 0 <= delay <= min(RateLimiter.BACKOFF_CAP, RateLimiter.BACKOFF_BASE * 2 ** (attempt - 1))
+    assert RateLimiter.backoff(1, retry_after=5) == 5
+    assert RateLimiter.backoff(1, retry_after=3600) == RateLimiter.BACKOFF_CAP
@@ -0,0 +1,45 @@
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+from stl.endpoint.transport import HttpTransport
+
+
+class NoLimit:
+    def acquire(self, url: str):
+        pass
+
+    def on_success(self, url: str):
+        pass
+
+    def on_throttle(self, url: str):
+        pass
+
+
+class FakeSession:
+    def __init__(self):
+        self.in_flight = self.max_in_flight = 0
+        self.lock = Lock()
+
+    def request(self, method: str, url: str, **kwargs):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(0.01)
+        with self.lock:
+            self.in_flight -= 1
+        return type('Response', (), {'status_code': 200, 'ok': True})()
+
+
+def test_requests_in_flight_are_bounded_by_pool_size():
+    transport = HttpTransport(pool_size=3, rate_limiter=NoLimit())
+    session = transport._HttpTransport__session = FakeSession()
+
+    def fan_out(i: int):  # a worker fanning out into nested requests, like listings and their review pages
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            list(executor.map(lambda j: transport.get('https://www.airbnb.com/%d/%d' % (i, j)), range(3)))
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        list(executor.map(fan_out, range(4)))
+    assert session.max_in_flight == 3
@@ -0,0 +1,97 @@
+import os
+
+from random import uniform
+from threading import Lock
+from time import monotonic, sleep
+from urllib.parse import urlparse
+
+
+class TokenBucket:
+    """Thread-safe token bucket with an AIMD-adjusted refill rate.
+
+    Each successful response additively increases the rate up to `max_rate`; each throttling signal (429, 5xx or a
+    retryable API error) multiplicatively decreases it down to `min_rate`.
+    """
+
+    def __init__(
+            self,
+            max_rate: float,
+            min_rate: float = 0.1,
+            burst: float = 1,
+            increase: float = 0.1,
+            decrease: float = 0.5
+    ):
+        self.__max_rate = max_rate
+        self.__min_rate = min(min_rate, max_rate)
+        self.__rate = max_rate
+        self.__burst = burst
+        self.__increase = increase
+        self.__decrease = decrease
+        self.__tokens = burst
+        self.__updated = monotonic()
+        self.__lock = Lock()
+
+    @property
+    def rate(self) -> float:
+        return self.__rate
+
+    def acquire(self):
+        """Take a token, blocking until one is available. Tokens are reserved under the lock, waiting happens
+        outside it, so concurrent callers are spaced out at the current rate."""
+        with self.__lock:
+            now = monotonic()
+            self.__tokens = min(self.__burst, self.__tokens + (now - self.__updated) * self.__rate)
+            self.__updated = now
+            self.__tokens -= 1
+            wait = -self.__tokens / self.__rate if self.__tokens < 0 else 0
+        if wait > 0:
+            sleep(wait)
+
+    def on_success(self):
+        with self.__lock:
+            self.__rate = min(self.__max_rate, self.__rate + self.__increase)
+
+    def on_throttle(self):
+        with self.__lock:
+            self.__rate = max(self.__min_rate, self.__rate * self.__decrease)
+
+
+class RateLimiter:
+    """Per-host token buckets, shared by every endpoint using the same transport."""
+    DEFAULT_MAX_RATE = 10.0  # requests per second
+    BACKOFF_BASE = 2.0  # seconds
+    BACKOFF_CAP = 60.0  # seconds
+
+    def __init__(self, max_rate: float = DEFAULT_MAX_RATE):
+        self.__max_rate = max_rate
+        self.__buckets = {}
+        self.__lock = Lock()
+
+    @classmethod
+    def from_env(cls) -> 'RateLimiter':
+        """Create rate limiter allowing at most one request per THROTTLE seconds to each host."""
+        throttle = float(os.getenv('THROTTLE', 0))
+        return cls(1 / throttle if throttle > 0 else cls.DEFAULT_MAX_RATE)
+
+    def bucket(self, url: str) -> TokenBucket:
+        host = urlparse(url).netloc
+        with self.__lock:
+            if host not in self.__buckets:
+                self.__buckets[host] = TokenBucket(self.__max_rate)
+            return self.__buckets[host]
+
+    def acquire(self, url: str):
+        self.bucket(url).acquire()
+
+    def on_success(self, url: str):
+        self.bucket(url).on_success()
+
+    def on_throttle(self, url: str):
+        self.bucket(url).on_throttle()
+
+    @classmethod
+    def backoff(cls, attempt: int, retry_after: float = None) -> float:
+        """Get "full jitter" exponential backoff delay in seconds for a 1-indexed retry attempt."""
+        if retry_after:
+            return min(cls.BACKOFF_CAP, retry_after)
+        return uniform(0, min(cls.BACKOFF_CAP, cls.BACKOFF_BASE * 2 ** (attempt - 1)))
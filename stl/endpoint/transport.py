@@ -0,0 +1,108 @@
+import os
+import requests
+
+from requests.adapters import HTTPAdapter
+from threading import Condition
+
+from stl.endpoint.throttle import RateLimiter
+
+
+class HttpTransport:
+    """Pooled, keep-alive HTTP transport shared by all endpoints.
+
+    Wraps a single `requests.Session` so that connections (and their TLS sessions) to the CORS proxy and to Airbnb
+    are reused across PDP, calendar, pricing and review calls instead of being re-established for every request.
+    Every request first takes a token from the per-host rate limiter, and the response status is fed back into it.
+    At most pool_size requests are in flight at a time, also when workers fan out into further requests (e.g. the
+    review pages of listings fetched in parallel), so that no connection is opened beyond the pool and discarded.
+    """
+    DEFAULT_POOL_SIZE = 10
+    DEFAULT_CONNECT_TIMEOUT = 5.0
+    DEFAULT_READ_TIMEOUT = 30.0
+
+    __shared = None
+
+    def __init__(
+            self,
+            pool_size: int = DEFAULT_POOL_SIZE,
+            connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+            read_timeout: float = DEFAULT_READ_TIMEOUT,
+            rate_limiter: RateLimiter = None
+    ):
+        self.__rate_limiter = rate_limiter or RateLimiter()
+        self.__timeout = (connect_timeout, read_timeout)
+        self.__session = requests.Session()
+        self.__session.headers.update({
+            'Accept-Encoding': 'gzip, deflate',
+            'Connection':      'keep-alive',
+        })
+        self.__pool_size = 0
+        self.__in_flight = 0
+        self.__slots = Condition()
+        self.ensure_pool_size(pool_size)
+
+    @classmethod
+    def from_env(cls, pool_size: int = None) -> 'HttpTransport':
+        """Create transport configured from HTTP_POOL_SIZE, HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT and THROTTLE."""
+        return cls(
+            pool_size=pool_size or int(os.getenv('HTTP_POOL_SIZE', cls.DEFAULT_POOL_SIZE)),
+            connect_timeout=float(os.getenv('HTTP_CONNECT_TIMEOUT', cls.DEFAULT_CONNECT_TIMEOUT)),
+            read_timeout=float(os.getenv('HTTP_READ_TIMEOUT', cls.DEFAULT_READ_TIMEOUT)),
+            rate_limiter=RateLimiter.from_env()
+        )
+
+    @classmethod
+    def shared(cls) -> 'HttpTransport':
+        """Get the process-wide transport used by endpoints which were not given one explicitly."""
+        if cls.__shared is None:
+            cls.__shared = cls.from_env()
+        return cls.__shared
+
+    @property
+    def rate_limiter(self) -> RateLimiter:
+        return self.__rate_limiter
+
+    @property
+    def pool_size(self) -> int:
+        return self.__pool_size
+
+    def ensure_pool_size(self, pool_size: int):
+        """Grow the connection pool so that at least pool_size requests can be kept alive concurrently."""
+        if pool_size <= self.__pool_size:
+            return
+        # retries are handled by the endpoints, which know how to interpret API errors
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.__session.mount('https://', adapter)
+        self.__session.mount('http://', adapter)
+        with self.__slots:
+            self.__pool_size = pool_size
+            self.__slots.notify_all()
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault('timeout', self.__timeout)
+        with self.__slots:
+            self.__slots.wait_for(lambda: self.__in_flight < self.__pool_size)
+            self.__in_flight += 1
+        try:
+            self.__rate_limiter.acquire(url)
+            response = self.__session.request(method, url, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            self.__rate_limiter.on_throttle(url)
+            raise
+        finally:
+            with self.__slots:
+                self.__in_flight -= 1
+                self.__slots.notify()
+
+        if response.status_code == 429 or response.status_code >= 500:
+            self.__rate_limiter.on_throttle(url)
+        elif response.ok:
+            self.__rate_limiter.on_success(url)
+
+        return response
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def close(self):
+        self.__session.close()
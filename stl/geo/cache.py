@@ -0,0 +1,105 @@
+import json
+import os
+import sqlite3
+
+from threading import Lock
+
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def encode_geohash(lat: float, lon: float, precision: int) -> str:
+    """Encode a coordinate as a geohash of `precision` characters. Coordinates with the same geohash lie in the same
+    cell, e.g. ~150m x 150m for precision 7."""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    geohash, bits, n_bits, is_lon = [], 0, 0, True
+    while len(geohash) < precision:
+        value, value_range = (lon, lon_range) if is_lon else (lat, lat_range)
+        mid = (value_range[0] + value_range[1]) / 2
+        bits <<= 1
+        if value >= mid:
+            bits |= 1
+            value_range[0] = mid
+        else:
+            value_range[1] = mid
+        is_lon = not is_lon
+        n_bits += 1
+        if n_bits == 5:
+            geohash.append(GEOHASH_ALPHABET[bits])
+            bits, n_bits = 0, 0
+
+    return ''.join(geohash)
+
+
+class GeocodeCache:
+    """Persistent cache of reverse geocoded addresses by geohash cell, and of city name lookups.
+
+    Geography doesn't change, so entries never expire. Misses (no address found) are cached as well, so that the
+    geocoders are only queried once per cell.
+    """
+    DEFAULT_PRECISION = 7
+
+    def __init__(self, path: str = ':memory:', precision: int = DEFAULT_PRECISION):
+        self.precision = precision
+        self.__lock = Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.__db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.__db.execute("""
+            CREATE TABLE IF NOT EXISTS addresses (
+                geohash TEXT PRIMARY KEY,
+                address TEXT
+            )
+        """)
+        self.__db.execute("""
+            CREATE TABLE IF NOT EXISTS cities (
+                name    TEXT NOT NULL,
+                country TEXT NOT NULL,
+                is_city INTEGER NOT NULL,
+                PRIMARY KEY (name, country)
+            )
+        """)
+
+    @classmethod
+    def from_env(cls) -> 'GeocodeCache':
+        """Create cache at GEOCODE_CACHE_PATH with GEOCODE_PRECISION geohash cells, in memory if no path is set."""
+        return cls(
+            os.getenv('GEOCODE_CACHE_PATH') or ':memory:',
+            int(os.getenv('GEOCODE_PRECISION', cls.DEFAULT_PRECISION))
+        )
+
+    def get_address(self, lat: float, lon: float) -> tuple:
+        """Get (found, address) for the cell of a coordinate. address is False for cached misses."""
+        with self.__lock:
+            row = self.__db.execute(
+                'SELECT address FROM addresses WHERE geohash = ?', (self.__get_geohash(lat, lon),)).fetchone()
+        if row is None:
+            return False, None
+
+        return True, json.loads(row[0]) if row[0] else False
+
+    def set_address(self, lat: float, lon: float, address: dict | bool):
+        with self.__lock:
+            self.__db.execute(
+                'INSERT OR REPLACE INTO addresses (geohash, address) VALUES (?, ?)',
+                (self.__get_geohash(lat, lon), json.dumps(address) if address else None)
+            )
+
+    def get_is_city(self, name: str, country: str) -> bool | None:
+        """Get cached city lookup result, or None if the name hasn't been looked up."""
+        with self.__lock:
+            row = self.__db.execute(
+                'SELECT is_city FROM cities WHERE name = ? AND country = ?', (name, country)).fetchone()
+
+        return bool(row[0]) if row else None
+
+    def set_is_city(self, name: str, country: str, is_city: bool):
+        with self.__lock:
+            self.__db.execute(
+                'INSERT OR REPLACE INTO cities (name, country, is_city) VALUES (?, ?, ?)', (name, country, is_city))
+
+    def __get_geohash(self, lat: float, lon: float) -> str:
+        return encode_geohash(float(lat), float(lon), self.precision)
+
+    def close(self):
+        self.__db.close()
@@ -1,33 +1,72 @@
 import os
 
+from geopy.exc import GeopyError
 from geopy.geocoders import Nominatim, GoogleV3
 from geopy.extra.rate_limiter import RateLimiter
 from random import randint
 
+from stl.geo.cache import GeocodeCache
+
 
 class Geocoder:
+    # Google address component types by OSM address key
+    GMAPS_COMPONENT_TYPES = {
+        'city':          'locality',
+        'neighbourhood': 'neighborhood',
+        'suburb':        'sublocality',
+        'state':         'administrative_area_level_1',
+        'country':       'country',
+    }
+
+    __shared = None
 
-    def __init__(self) -> None:
+    def __init__(self, cache: GeocodeCache = None) -> None:
+        self.__cache = cache or GeocodeCache.from_env()
         gmaps_api_key = os.environ.get('GMAPS_API_KEY')
         self.__gmaps = GoogleV3(api_key=gmaps_api_key) if gmaps_api_key else None
         user_agent = 'stl-scraper-{}'.format(randint(1, 10000))
         self.__geolocator = Nominatim(user_agent=user_agent)
         self.__osm_reverse_geo = RateLimiter(self.__geolocator.reverse, min_delay_seconds=1)
 
+    @classmethod
+    def shared(cls) -> 'Geocoder':
+        """Get the process-wide geocoder, so that all endpoints share one Nominatim client and its rate limit."""
+        if cls.__shared is None:
+            cls.__shared = cls()
+        return cls.__shared
+
     def is_city(self, name: str, country: str):
-        try:
-            location = self.__geolocator.geocode({'city': name, 'country': country})
-            if location.raw['type'] == 'city':
-                return True
-            else:
+        """Check whether name is a city. Only answers of the geocoder are cached: after a timeout or service error,
+        name is not taken for a city this time, and looked up again next time."""
+        is_city = self.__cache.get_is_city(name, country or '')
+        if is_city is None:
+            try:
+                is_city = self.__is_city(name, country)
+            except GeopyError:
                 return False
-        except:
-            return False
+            self.__cache.set_is_city(name, country or '', is_city)
+
+        return is_city
+
+    def __is_city(self, name: str, country: str) -> bool:
+        location = self.__geolocator.geocode({'city': name, 'country': country})
+        return location is not None and location.raw.get('type') == 'city'
 
     def reverse(self, lat: float, lon: float) -> dict | bool:
+        """Get address of a coordinate. Addresses are cached by geohash cell, so that neighbouring listings are only
+        geocoded once."""
+        found, address = self.__cache.get_address(lat, lon)
+        if not found:
+            address = self.__reverse(lat, lon)
+            self.__cache.set_address(lat, lon, address)
+
+        return address
+
+    def __reverse(self, lat: float, lon: float) -> dict | bool:
         """Tries OSM reverse geocoder (Nomatim) first. If it fails, tries Google Maps reverse geocoder (untested)."""
         # Try OSM
-        address = self.__osm_reverse_geo((lat, lon), language='en').raw['address']
+        location = self.__osm_reverse_geo((lat, lon), language='en')
+        address = location.raw['address'] if location else {}
         if 'city' in address:
             return address
         if 'town' in address:
@@ -39,8 +78,22 @@ class Geocoder:
 
         # Else try google maps
         if self.__gmaps:
-            address = self.__gmaps.reverse((lat, lon), language='en')
+            location = self.__gmaps.reverse((lat, lon), language='en')
+            address = self.__get_gmaps_address(location.raw) if location else {}
             if 'city' in address:
                 return address
 
         return False
+
+    @staticmethod
+    def __get_gmaps_address(result: dict) -> dict:
+        """Convert Google address components to an OSM style address."""
+        address = {}
+        for component in result.get('address_components', []):
+            for key, component_type in Geocoder.GMAPS_COMPONENT_TYPES.items():
+                if component_type in component['types'] and key not in address:
+                    address[key] = component['long_name']
+            if 'country' in component['types']:
+                address['country_code'] = component['short_name'].lower()
+
+        return address
@@ -0,0 +1,64 @@
+import unicodedata
+
+from threading import Lock
+
+import pycountry
+
+# names used in addresses which are neither pycountry names nor codes, by country code
+COUNTRY_ALIASES = {'Macau': 'MO', 'Russia': 'RU', 'The Netherlands': 'NL', 'UK': 'GB'}
+
+# subdivision types that are cities themselves, e.g. 'Metropolitan city' (Roma) or 'Capital city' (Budapest)
+CITY_SUBDIVISION_TYPES = ['capital', 'city', 'federal district', 'metropolitan administration', 'municipality']
+
+_place_index = None
+_place_index_lock = Lock()
+
+
+def normalize_place_name(name: str) -> str:
+    return unicodedata.normalize('NFKC', name).strip().casefold()
+
+
+def is_city_subdivision(subdivision) -> bool:
+    """Check whether a subdivision is likely named after a city. Below the first level, subdivisions (provinces,
+    departments, ...) mostly carry the name of their seat, e.g. Madrid, Paris or Milano."""
+    subdivision_type = subdivision.type.casefold()
+    return subdivision.parent_code is not None or any(word in subdivision_type for word in CITY_SUBDIVISION_TYPES)
+
+
+def get_place_index() -> tuple:
+    """Get (countries, subdivisions): the country code by normalized country name, code and alias, and the
+    normalized subdivision names and codes by country code (all countries under None). Subdivisions named after a
+    city only have their code indexed. Built once per process on first use: pycountry lookups scan thousands of
+    records per call."""
+    global _place_index
+    if _place_index is None:
+        with _place_index_lock:
+            if _place_index is None:
+                countries = {normalize_place_name(alias): code for alias, code in COUNTRY_ALIASES.items()}
+                for country in pycountry.countries:
+                    for attribute in ('alpha_2', 'alpha_3', 'name', 'official_name', 'common_name'):
+                        if getattr(country, attribute, None):
+                            countries[normalize_place_name(getattr(country, attribute))] = country.alpha_2
+                subdivisions = {}
+                for subdivision in pycountry.subdivisions:
+                    names = subdivisions.setdefault(subdivision.country_code, set())
+                    names.add(normalize_place_name(subdivision.code))
+                    if not is_city_subdivision(subdivision):
+                        names.add(normalize_place_name(subdivision.name))
+                subdivisions[None] = set().union(*subdivisions.values())
+                _place_index = countries, {code: frozenset(names) for code, names in subdivisions.items()}
+
+    return _place_index
+
+
+def is_country_or_subdivision(name: str, country: str = None) -> bool:
+    """Check whether name is a country, or a subdivision (state, province, region, ...) of country if given."""
+    countries, subdivisions = get_place_index()
+    name = normalize_place_name(name)
+    if name in countries:
+        return True
+    country_code = countries.get(normalize_place_name(country)) if country else None
+    if country_code is None:  # no or unknown country
+        return name in subdivisions[None]
+
+    return name in subdivisions.get(country_code, ())
@@ -0,0 +1,46 @@
+from stl.geo.cache import GeocodeCache, encode_geohash
+
+
+def test_encode_geohash():
+    assert encode_geohash(57.64911, 10.40744, 11) == 'u4pruydqqvj'
+    assert encode_geohash(40.748, -73.985, 7) == encode_geohash(40.7481, -73.9851, 7)
+
+
+def test_cache_addresses_by_cell_and_misses(tmp_path):
+    cache = GeocodeCache(str(tmp_path / 'geocode.sqlite'), precision=7)
+    assert cache.get_address(40.748, -73.985) == (False, None)
+    cache.set_address(40.748, -73.985, {'city': 'New York'})
+    cache.set_address(0.0, -30.0, False)
+
+    reopened = GeocodeCache(str(tmp_path / 'geocode.sqlite'), precision=7)
+    assert reopened.get_address(40.7481, -73.9851) == (True, {'city': 'New York'})  # same block
+    assert reopened.get_address(0.0, -30.0) == (True, False)
+    assert reopened.get_address(40.76, -73.985) == (False, None)
+
+
+def test_cache_is_city(tmp_path):
+    cache = GeocodeCache()
+    assert cache.get_is_city('Brooklyn', 'United States') is None
+    cache.set_is_city('Brooklyn', 'United States', False)
+    assert cache.get_is_city('Brooklyn', 'United States') is False
+
+
+def test_is_city_does_not_cache_geocoder_errors():
+    from geopy.exc import GeocoderTimedOut
+    from stl.geo.geocode import Geocoder
+
+    class FakeGeolocator:
+        def __init__(self):
+            self.answers = [GeocoderTimedOut('timed out'), type('Location', (), {'raw': {'type': 'city'}})()]
+
+        def geocode(self, query):
+            answer = self.answers.pop(0)
+            if isinstance(answer, Exception):
+                raise answer
+            return answer
+
+    geocoder = Geocoder(GeocodeCache())
+    geocoder._Geocoder__geolocator = FakeGeolocator()
+    assert not geocoder.is_city('Berlin', 'Germany')  # timed out, not cached
+    assert geocoder.is_city('Berlin', 'Germany')
+    assert geocoder.is_city('Berlin', 'Germany')  # cached
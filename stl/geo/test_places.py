@@ -0,0 +1,20 @@
+from stl.geo.places import get_place_index, is_country_or_subdivision
+
+
+def test_countries_subdivisions_and_aliases():
+    for name in ['Italy', 'ITA', 'united states', 'UK', 'Lazio', 'California', 'US-CA', ' Bayern ']:
+        assert is_country_or_subdivision(name), name
+    for name in ['Brooklyn', 'Trastevere', 'Downtown']:
+        assert not is_country_or_subdivision(name), name
+
+
+def test_subdivisions_named_after_cities_and_other_countries_are_left_out():
+    for name in ['Roma', 'Madrid', 'Paris', 'Budapest']:
+        assert not is_country_or_subdivision(name), name
+    assert is_country_or_subdivision('Bayern', 'Germany') and is_country_or_subdivision('DE-BY', 'DE')
+    assert not is_country_or_subdivision('Lazio', 'Germany')
+    assert is_country_or_subdivision('Germany', 'Italy')
+
+
+def test_index_is_built_once():
+    assert get_place_index() is get_place_index()
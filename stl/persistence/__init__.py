@@ -1,7 +1,41 @@
 from abc import ABC, abstractmethod
+from itertools import islice
 
 
 class PersistenceInterface(ABC):
+    STREAM_BATCH_SIZE = 500  # number of listings a streamed run holds in memory before saving them
+
     @abstractmethod
     def save(self, query: str, listings: list):
         pass
+
+    def save_stream(self, query: str, listings):
+        """Save listings from any iterable, e.g. `AirbnbSearchScraper.iter_listings`, STREAM_BATCH_SIZE at a time."""
+        listings = iter(listings)
+        while batch := list(islice(listings, self.STREAM_BATCH_SIZE)):
+            self.save(query, batch)
+
+    def get_listings(self, listing_ids: list) -> dict:
+        """Get previously saved listings by id. Backends that can't be read back return none."""
+        return {}
+
+
+class StreamingPersistenceInterface(PersistenceInterface):
+    """Persistence that writes each listing as soon as it is parsed, instead of once at the end of a run."""
+    STREAM_BATCH_SIZE = 100
+
+    @abstractmethod
+    def append(self, query: str, listing: dict):
+        pass
+
+    def flush(self):
+        """Make sure everything appended so far is written. Called at the end of a run."""
+        pass
+
+    def save(self, query: str, listings: list):
+        self.save_stream(query, listings)
+
+    def save_stream(self, query: str, listings):
+        for listing in listings:
+            self.append(query, listing)
+        self.flush()
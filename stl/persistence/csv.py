@@ -1,16 +1,83 @@
 import csv
+import os
 
-from stl.persistence import PersistenceInterface
+from threading import Lock
 
+from stl.persistence import StreamingPersistenceInterface
 
-class Csv(PersistenceInterface):
 
-    def __init__(self, csv_path: str):
+class Csv(StreamingPersistenceInterface):
+    """Streaming CSV persistence with a fixed column order.
+
+    Rows are written as listings arrive and flushed to disk every `batch_size` rows. In append mode, rows are added to
+    an existing file, keeping that file's header. With `skip_written`, listings which already have a row in the file
+    are not written again, e.g. those of pages a resumed search redoes because it failed before their checkpoint.
+    """
+    FIELDNAMES = [
+        'id', 'url', 'name', 'source', 'product_id', 'updated_at', 'fingerprint',
+        'city', 'neighborhood', 'state', 'province', 'country', 'place_id', 'latitude', 'longitude', 'coordinates',
+        'room_and_property_type', 'room_type', 'room_type_category', 'person_capacity', 'bedrooms', 'beds',
+        'bathrooms', 'is_hotel', 'business_travel_ready', 'can_instant_book', 'host_id',
+        'price_rate', 'price_rate_type', 'price_currency', 'price_cleaning', 'price_per_date',
+        'monthly_price_factor', 'weekly_price_factor',
+        'avg_rating', 'review_count', 'star_rating', 'satisfaction_guest', 'rating_accuracy', 'rating_checkin',
+        'rating_cleanliness', 'rating_communication', 'rating_location', 'rating_value',
+        'photo_count', 'amenities', 'access', 'allows_events', 'house_rules', 'additional_house_rules',
+        'listing_expectations', 'description', 'neighborhood_overview', 'transit', 'interaction', 'reviews',
+    ]
+
+    def __init__(self, csv_path: str, append: bool = False, batch_size: int = 100, skip_written: bool = False):
         self.__csv_path = csv_path
+        self.__append = append
+        self.__skip_written = skip_written
+        self.__written_ids = set()
+        self.__batch_size = batch_size
+        self.__file = None
+        self.__writer = None
+        self.__rows = []
+        self.__lock = Lock()
+
+    def append(self, query: str, listing: dict):
+        with self.__lock:
+            self.__rows.append(listing)
+            if len(self.__rows) >= self.__batch_size:
+                self.__write_rows()
+
+    def flush(self):
+        with self.__lock:
+            self.__write_rows()
+            if self.__file is not None:
+                self.__file.close()
+                self.__file = self.__writer = None
+                self.__append = True  # don't truncate rows written so far if this instance is used again
+
+    def __open(self):
+        """Open the CSV file, writing the header unless appending to a file which already has one."""
+        if self.__append and os.path.isfile(self.__csv_path) and os.path.getsize(self.__csv_path):
+            with open(self.__csv_path, 'r', encoding='utf-8', newline='') as csvfile:
+                reader = csv.reader(csvfile)
+                fieldnames = next(reader)
+                if self.__skip_written and 'id' in fieldnames:
+                    id_index = fieldnames.index('id')
+                    self.__written_ids.update(row[id_index] for row in reader if len(row) > id_index)
+            self.__file = open(self.__csv_path, 'a', encoding='utf-8', newline='')
+            self.__writer = csv.DictWriter(self.__file, fieldnames=fieldnames, extrasaction='ignore')
+        else:
+            self.__file = open(self.__csv_path, 'w', encoding='utf-8', newline='')
+            self.__writer = csv.DictWriter(self.__file, fieldnames=self.FIELDNAMES, extrasaction='ignore')
+            self.__writer.writeheader()
 
-    def save(self, query: str, listings: list):
-        with open(self.__csv_path, 'w', encoding='utf-8', newline='') as csvfile:
-            fieldnames = set().union(*[listing.keys() for listing in listings])
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(listings)
+    def __write_rows(self):
+        if not self.__rows:
+            return
+        if self.__file is None:
+            self.__open()
+        if self.__skip_written:
+            rows = [row for row in self.__rows if str(row.get('id')) not in self.__written_ids]
+            self.__written_ids.update(str(row.get('id')) for row in rows)
+        else:
+            rows = self.__rows
+        self.__writer.writerows(rows)
+        self.__rows = []
+        self.__file.flush()
+        os.fsync(self.__file.fileno())
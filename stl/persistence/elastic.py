@@ -1,4 +1,5 @@
 from datetime import datetime
+from threading import Lock
 from elasticsearch import Elasticsearch
 from elasticsearch.helpers import bulk, scan
 from elasticsearch.exceptions import RequestError
@@ -20,6 +21,7 @@ class Elastic(PersistenceInterface):
             "bathrooms":              {"type": "float"},
             "bedrooms":               {"type": "short"},
             "beds":                   {"type": "integer"},
+            "booking_months":         {"type": "object", "enabled": False},
             "bookings":               {
                 "type":       "nested",
                 "properties": {"date": {"type": "date", "format": "yyyy-MM-dd"}}
@@ -31,6 +33,7 @@ class Elastic(PersistenceInterface):
             "description":            {"type": "text"},
             "discount_monthly":       {"type": "float"},
             "discount_weekly":        {"type": "float"},
+            "fingerprint":            {"type": "keyword"},
             "host_id":                {"type": "integer", "fields": {"keyword": {"type": "keyword"}}},
             "house_rules":            {"type": "text"},
             "interaction":            {"type": "text"},
@@ -72,13 +75,21 @@ class Elastic(PersistenceInterface):
         }
     }
 
-    def __init__(self, es: Elasticsearch, index: str):
+    def __init__(self, es: Elasticsearch, index: str, bulk_size: int = 500):
         self.__es = es
         self.__index = index
+        self.__bulk_size = bulk_size
+        self.__actions = []
+        self.__errors = []
+        self.__lock = Lock()
 
     def create_index_if_not_exists(self, index_name: str):
-        """Create an index if it doesn't already exist."""
+        """Create an index if it doesn't already exist, or add mappings introduced since it was created."""
         if self.__es.indices.exists(index=index_name):
+            # keep booking bitmaps out of the index, "yyyy-MM" keys would otherwise each become a mapped field
+            self.__es.indices.put_mapping(index=index_name, properties={
+                field: self.INDEX_MAPPINGS['properties'][field] for field in ('booking_months', 'fingerprint')
+            })
             return
         try:
             self.__es.indices.create(index=index_name, ignore=1, mappings=self.INDEX_MAPPINGS)
@@ -91,7 +102,10 @@ class Elastic(PersistenceInterface):
         self.__es.delete(index=self.__index, id=listing_id)
 
     def get_all_index_ids(self, since: str):
-        """Get all index ids not updated since "since" (default: "1d"), except those marked as deleted."""
+        """Get all index ids not updated since "since" (default: "1d"), except those marked as deleted.
+
+        Listings are processed while the scroll is open, so each batch gets a generous keep-alive.
+        """
         query = {
             "query": {
                 "bool": {
@@ -119,77 +133,142 @@ class Elastic(PersistenceInterface):
         hits = scan(
             self.__es,
             query=query,
-            scroll='2m',
+            scroll='10m',
+            size=100,
             index=self.__index
         )
         return (hit['_id'] for hit in hits)
 
+    def get_listings(self, listing_ids: list) -> dict:
+        """Get listings by id in a single multi-get request. Bookings are left out, they are only updated by the
+        calendar scraper."""
+        if not listing_ids:
+            return {}
+        response = self.__es.mget(
+            index=self.__index, ids=listing_ids, source_excludes=['bookings', 'booking_months'])
+
+        return {doc['_id']: doc['_source'] for doc in response['docs'] if doc.get('found')}
+
     def mark_deleted(self, listing_id: str):
         """Mark a listing as deleted by setting the 'deleted' field to True."""
         self.__es.update(index=self.__index, id=listing_id, doc={'deleted': True})
 
     def save(self, query: str, listings: list):
         """Bulk save listings by upsert."""
-        bulk(self.__es, index=self.__index, actions=[{
+        self.save_stream(query, listings)
+
+    def save_stream(self, query: str, listings):
+        """Bulk save listings by upsert, sending bulk_size of them per request as they come."""
+        bulk(self.__es, index=self.__index, chunk_size=self.__bulk_size, actions=({
             '_op_type':      'update',
             '_id':           listing['id'],
             'doc':           listing,
             'doc_as_upsert': True
-        } for listing in listings])
+        } for listing in listings))
+
+    @staticmethod
+    def get_booking_months(booked_dates) -> dict:
+        """Get compact booking representation: one bitmap per "yyyy-MM" month, with bit (day - 1) set for each booked
+        day."""
+        months = {}
+        for dt in booked_dates:
+            dt = str(dt)
+            month, day = dt[:7], int(dt[8:10])
+            months[month] = months.get(month, 0) | (1 << (day - 1))
+
+        return months
 
     def update_calendar(self, listing_id: str, calendar: dict):
+        """Queue merge of booked dates into the listing's booking bitmaps.
+
+        Merging is a bitwise OR per month, linear in the incoming months. The nested "bookings" field is derived from
+        the bitmaps (in date order, without any date parsing) and only rewritten when new booked days were added.
+        """
         booked_dates = [dt for dt, is_booked in calendar.items() if is_booked]
-        exists_booking_field = self.__es.search(index=self.__index, query={
-            "bool": {
-                "must":   {
-                    "exists": {
-                        "field": "bookings"
+        script = {
+            "source": """
+                def months = ctx._source.booking_months;
+                if (months == null) {
+                    // first merge for this listing: seed bitmaps from existing bookings
+                    months = new HashMap();
+                    if (ctx._source.bookings != null) {
+                        for (booking in ctx._source.bookings) {
+                            String month = booking.date.substring(0, 7);
+                            int day = Integer.parseInt(booking.date.substring(8, 10));
+                            long bits = months.containsKey(month) ? ((Number) months.get(month)).longValue() : 0L;
+                            months.put(month, bits | (1L << (day - 1)));
+                        }
                     }
-                },
-                "filter": {
-                    "term": {"_id": listing_id}
+                    ctx._source.booking_months = months;
                 }
-            }
-        })
-        bookings = [{'date': dt} for dt in booked_dates]
-        if exists_booking_field.body['hits']['hits']:
-            script = {
-                "source": """
-                    def updated = false;
-                    for (booking in params.bookings) {
-                        if (!ctx._source.bookings.contains(booking)) {
-                            ctx._source.bookings.add(booking);
-                            updated = true;
-                        }
+                boolean updated = false;
+                for (entry in params.months.entrySet()) {
+                    String month = entry.getKey();
+                    long bits = months.containsKey(month) ? ((Number) months.get(month)).longValue() : 0L;
+                    long merged = bits | ((Number) entry.getValue()).longValue();
+                    if (merged != bits) {
+                        months.put(month, merged);
+                        updated = true;
                     }
-                    if (updated) {
-                        // sort bookings
-                        ctx._source.bookings.sort((a,b) -> a.date == b.date 
-                            ? 0 
-                            : ZonedDateTime.parse(a.date + "T00:00:00Z").isBefore(ZonedDateTime.parse(b.date + "T00:00:00Z"))
-                                ? -1 
-                                : 1
-                        );
+                }
+                if (updated || ctx._source.bookings == null) {
+                    // derive queryable nested bookings from the bitmaps
+                    List keys = new ArrayList(months.keySet());
+                    Collections.sort(keys);
+                    List bookings = new ArrayList();
+                    for (def month : keys) {
+                        long bits = ((Number) months.get(month)).longValue();
+                        for (int day = 1; day <= 31; day++) {
+                            if ((bits & (1L << (day - 1))) != 0) {
+                                bookings.add(['date': month + (day < 10 ? '-0' : '-') + day]);
+                            }
+                        }
                     }
-                    // mark updated because we "touched" this listing
-                    ctx._source.updated_at = params.now;
-                """,
-                "params": {
-                    "bookings": bookings,
-                    "now":      datetime.utcnow()
+                    ctx._source.bookings = bookings;
                 }
+                // mark updated because we "touched" this listing
+                ctx._source.updated_at = params.now;
+            """,
+            "params": {
+                "months": self.get_booking_months(booked_dates),
+                "now":    datetime.utcnow()
             }
-            self.__es.update(index=self.__index, id=listing_id, script=script)
-        else:
-            self.__es.update(index=self.__index, id=listing_id, doc={
-                'bookings':   bookings,
-                'updated_at': datetime.utcnow()
-            })
+        }
+        self.__queue({'_op_type': 'update', '_id': listing_id, 'script': script})
 
     def update_pricing(self, listing_id: str, pricing: dict, min_nights: int = None, max_nights: int = None):
+        """Queue partial update of the listing's pricing fields."""
         if max_nights:
             pricing['nights_max'] = max_nights
         if min_nights:
             pricing['nights_min'] = min_nights
 
-        self.__es.update(index=self.__index, id=listing_id, doc=pricing)
+        self.__queue({'_op_type': 'update', '_id': listing_id, 'doc': pricing})
+
+    def flush(self) -> list:
+        """Send queued updates. Returns the errors of all actions which failed since the last flush."""
+        with self.__lock:
+            actions, self.__actions = self.__actions, []
+        errors = self.__send(actions)
+        with self.__lock:
+            errors, self.__errors = self.__errors + errors, []
+
+        return errors
+
+    def __queue(self, action: dict):
+        """Queue bulk action, sending the queue once it holds bulk_size actions."""
+        with self.__lock:
+            self.__actions.append(action)
+            if len(self.__actions) < self.__bulk_size:
+                return
+            actions, self.__actions = self.__actions, []
+        errors = self.__send(actions)
+        with self.__lock:
+            self.__errors += errors
+
+    def __send(self, actions: list) -> list:
+        if not actions:
+            return []
+        _, errors = bulk(self.__es, actions, index=self.__index, raise_on_error=False)
+
+        return errors
@@ -39,6 +39,18 @@ def update_listing(listing_dict: dict, listing_list: list) -> dict:
 class Json(PersistenceInterface):
     def __init__(self, json_path: str):
         self.__json_path = os.path.join(json_path, 'data.json')
+        self.__loaded = None  # (modification time, listing dict) of the last read
+
+    def get_listings(self, listing_ids: list) -> dict:
+        listing_dict = self.__load()
+        return {listing_id: listing_dict[listing_id] for listing_id in listing_ids if listing_id in listing_dict}
+
+    def __load(self) -> dict:
+        """Load listings, re-reading the file only once it has been written since the last read."""
+        mtime = os.path.getmtime(self.__json_path) if os.path.isfile(self.__json_path) else None
+        if self.__loaded is None or self.__loaded[0] != mtime:
+            self.__loaded = (mtime, load_json_dict(self.__json_path))
+        return self.__loaded[1]
 
     def save(self, query: str, listings: list):
         listing_dict = load_json_dict(self.__json_path)
@@ -0,0 +1,121 @@
+import json
+import os
+
+from threading import Lock
+
+from stl.persistence import StreamingPersistenceInterface
+from stl.persistence.json import merge_dicts
+
+
+def iter_json_lines(jsonl_file):
+    """Iterate over records in a JSON Lines file, skipping a line torn by a crash mid-write."""
+    if not os.path.isfile(jsonl_file):
+        return
+    with open(jsonl_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+class JsonLines(StreamingPersistenceInterface):
+    """Append-only JSON Lines persistence.
+
+    Every listing is appended to `listings.log.jsonl` as soon as it is parsed. Once the log grows past
+    `compact_bytes`, it is folded into the latest-state snapshot `listings.jsonl`, which holds one merged record per
+    listing id, and truncated.
+    """
+    DEFAULT_COMPACT_BYTES = 64 * 1024 * 1024
+
+    def __init__(self, jsonl_path: str, compact_bytes: int = DEFAULT_COMPACT_BYTES):
+        self.__log_path = os.path.join(jsonl_path, 'listings.log.jsonl')
+        self.__snapshot_path = os.path.join(jsonl_path, 'listings.jsonl')
+        self.__compact_bytes = compact_bytes
+        self.__log = None
+        self.__lock = Lock()
+        self.__state = None  # latest record per listing id, loaded on first lookup
+
+    def get_listings(self, listing_ids: list) -> dict:
+        """Get latest state of listings. The first call reads the snapshot and the log into memory, appended records
+        are applied to that state from then on."""
+        with self.__lock:
+            if self.__state is None:
+                self.__state = {}
+                for path in (self.__snapshot_path, self.__log_path):
+                    for listing in iter_json_lines(path):
+                        self.__merge_state(listing)
+            return {
+                listing_id: self.__state[str(listing_id)] for listing_id in listing_ids
+                if str(listing_id) in self.__state
+            }
+
+    def append(self, query: str, listing: dict):
+        line = json.dumps(listing, default=str, separators=(',', ':'))
+        with self.__lock:
+            if self.__state is not None:
+                self.__merge_state(json.loads(line))
+            if self.__log is None:
+                self.__log = self.__open_log()
+            self.__log.write(line + '\n')
+            self.__log.flush()  # survive a crash of the scraper process
+            if self.__log.tell() >= self.__compact_bytes:
+                self.__compact()
+
+    def flush(self):
+        with self.__lock:
+            if self.__log is not None:
+                os.fsync(self.__log.fileno())
+                self.__log.close()
+                self.__log = None
+
+    def compact(self):
+        """Fold the log into the snapshot and truncate it."""
+        with self.__lock:
+            self.__compact()
+
+    def __open_log(self):
+        """Open the log for appending, ending a line torn by a crash mid-write, so that it isn't joined with the next
+        record."""
+        torn = False
+        if os.path.isfile(self.__log_path) and os.path.getsize(self.__log_path) > 0:
+            with open(self.__log_path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                torn = f.read(1) != b'\n'
+        log = open(self.__log_path, 'a', encoding='utf-8')
+        if torn:
+            log.write('\n')
+
+        return log
+
+    def __merge_state(self, listing: dict):
+        listing_id = str(listing['id'])
+        self.__state[listing_id] = merge_dicts(self.__state[listing_id], listing) \
+            if listing_id in self.__state else listing
+
+    def __compact(self):
+        """Merge logged records into the snapshot. Memory use is bounded by the size of the log, not the snapshot."""
+        if self.__log is not None:
+            self.__log.close()
+            self.__log = None
+
+        updates = {}
+        for listing in iter_json_lines(self.__log_path):
+            listing_id = str(listing['id'])
+            updates[listing_id] = merge_dicts(updates[listing_id], listing) if listing_id in updates else listing
+        if not updates:
+            return
+
+        tmp_path = self.__snapshot_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for listing in iter_json_lines(self.__snapshot_path):
+                update = updates.pop(str(listing['id']), None)
+                f.write(json.dumps(merge_dicts(listing, update) if update else listing, separators=(',', ':')) + '\n')
+            for listing in updates.values():
+                f.write(json.dumps(listing, separators=(',', ':')) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+        # replacing the snapshot before truncating the log is safe: re-applying a log to a snapshot is a no-op
+        os.replace(tmp_path, self.__snapshot_path)
+        open(self.__log_path, 'w').close()
@@ -0,0 +1,152 @@
+import os
+import uuid
+
+from datetime import date, datetime
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # optional dependency: pip install stlscraper[parquet]
+    pa = ds = pq = None
+
+from stl.persistence import PersistenceInterface
+from stl.persistence.elastic import Elastic
+
+
+class Parquet(PersistenceInterface):
+    """Columnar persistence into two Parquet datasets, both partitioned by query and scrape date:
+
+    - `listings/`: one row per listing, typed after `Elastic.INDEX_MAPPINGS`
+    - `prices/`: `price_per_date` exploded into one (listing_id, date, price) row per night
+    """
+    ARROW_TYPES = {
+        'boolean': 'bool_',
+        'double':  'float64',
+        'float':   'float32',
+        'integer': 'int32',
+        'keyword': 'string',
+        'long':    'int64',
+        'short':   'int16',
+        'text':    'string',
+    }
+    LIST_FIELDS = {'amenities', 'amenity_ids', 'house_rules', 'photos'}  # multi-valued in elasticsearch
+    EXTRA_FIELDS = {  # listing fields without an elasticsearch mapping
+        'id':                   'string',
+        'can_instant_book':     'bool_',
+        'listing_expectations': 'string',
+        'neighborhood':         'string',
+        'price_currency':       'string',
+        'price_rate':           'float64',
+        'price_rate_type':      'string',
+        'product_id':           'string',
+    }
+    TYPE_OVERRIDES = {'host_id': 'int64'}  # host ids have outgrown the 32 bit elasticsearch mapping
+    PARTITION_COLS = ['query', 'scrape_date']
+    STREAM_BATCH_SIZE = 5000  # each save writes a file per partition, so keep them few
+
+    def __init__(self, parquet_path: str):
+        if pa is None:
+            raise RuntimeError('Parquet storage requires pyarrow: pip install stlscraper[parquet]')
+        self.__listings_path = os.path.join(parquet_path, 'listings')
+        self.__prices_path = os.path.join(parquet_path, 'prices')
+        self.__listings_schema = self.get_listings_schema()
+        self.__prices_schema = pa.schema([
+            ('listing_id', pa.string()),
+            ('date', pa.date32()),
+            ('price', pa.float64()),
+            ('price_currency', pa.string()),
+            ('query', pa.string()),
+            ('scrape_date', pa.string()),
+        ])
+
+    @classmethod
+    def get_listings_schema(cls) -> 'pa.Schema':
+        """Build listings schema from the elasticsearch mappings. Nested fields (bookings, reviews) and geo points
+        (coordinates, also stored as latitude/longitude) are left out."""
+        fields = [(name, cls.EXTRA_FIELDS[name]) for name in cls.EXTRA_FIELDS]
+        for name, mapping in Elastic.INDEX_MAPPINGS['properties'].items():
+            if mapping['type'] in cls.ARROW_TYPES:
+                fields.append((name, cls.TYPE_OVERRIDES.get(name, cls.ARROW_TYPES[mapping['type']])))
+
+        schema = []
+        for name, type_name in fields:
+            arrow_type = getattr(pa, type_name)()
+            schema.append((name, pa.list_(arrow_type) if name in cls.LIST_FIELDS else arrow_type))
+        schema += [('updated_at', pa.timestamp('us')), ('query', pa.string()), ('scrape_date', pa.string())]
+
+        return pa.schema(schema)
+
+    def save(self, query: str, listings: list):
+        if not listings:
+            return
+        scrape_date = date.today().isoformat()
+        listing_rows, price_rows = [], []
+        for listing in listings:
+            listing_rows.append(self.__to_row(listing, query, scrape_date))
+            for night, price in (listing.get('price_per_date') or {}).items():
+                price_rows.append({
+                    'listing_id':     str(listing['id']),
+                    'date':           date.fromisoformat(str(night)),
+                    'price':          self.__coerce(price, pa.float64()),
+                    'price_currency': listing.get('price_currency'),
+                    'query':          query,
+                    'scrape_date':    scrape_date,
+                })
+
+        self.__write(pa.Table.from_pylist(listing_rows, schema=self.__listings_schema), self.__listings_path)
+        if price_rows:
+            self.__write(pa.Table.from_pylist(price_rows, schema=self.__prices_schema), self.__prices_path)
+
+    @staticmethod
+    def read_listings(parquet_path: str, query: str = None) -> 'pa.Table':
+        return Parquet.__read(os.path.join(parquet_path, 'listings'), query)
+
+    @staticmethod
+    def read_prices(parquet_path: str, query: str = None) -> 'pa.Table':
+        return Parquet.__read(os.path.join(parquet_path, 'prices'), query)
+
+    @staticmethod
+    def __read(path: str, query: str = None) -> 'pa.Table':
+        dataset = ds.dataset(path, format='parquet', partitioning='hive')
+        return dataset.to_table(filter=(ds.field('query') == query) if query else None)
+
+    def __to_row(self, listing: dict, query: str, scrape_date: str) -> dict:
+        row = {}
+        for field in self.__listings_schema:
+            row[field.name] = self.__coerce(listing.get(field.name), field.type)
+        row['query'] = query
+        row['scrape_date'] = scrape_date
+
+        return row
+
+    @staticmethod
+    def __coerce(value, arrow_type: 'pa.DataType'):
+        """Convert a scraped value to the python type pyarrow expects for the column, or None if it can't be."""
+        if value is None or value == '':
+            return None
+        try:
+            if pa.types.is_list(arrow_type):
+                values = value if isinstance(value, list) else [value]
+                return [Parquet.__coerce(v, arrow_type.value_type) for v in values]
+            if pa.types.is_boolean(arrow_type):
+                return bool(value)
+            if pa.types.is_integer(arrow_type):
+                value = int(value)
+                return value if value.bit_length() < arrow_type.bit_width else None
+            if pa.types.is_floating(arrow_type):
+                return float(value)
+            if pa.types.is_timestamp(arrow_type):
+                return value if isinstance(value, datetime) else datetime.fromisoformat(str(value))
+        except (TypeError, ValueError):
+            return None
+
+        return str(value)
+
+    def __write(self, table: 'pa.Table', path: str):
+        pq.write_to_dataset(
+            table,
+            root_path=path,
+            partition_cols=self.PARTITION_COLS,
+            basename_template='part-{}-{{i}}.parquet'.format(uuid.uuid4().hex)
+        )
@@ -0,0 +1,40 @@
+from stl.persistence.csv import *
+import csv
+import pytest
+
+@pytest.fixture
+def csv_path(tmp_path):
+    return str(tmp_path / 'Rome, Italy.csv')
+
+def read_rows(csv_path):
+    with open(csv_path, encoding='utf-8', newline='') as f:
+        return list(csv.DictReader(f))
+
+def test_columns_are_stable(csv_path):
+    Csv(csv_path).save('Rome, Italy', [{'name': 'Listing 1', 'id': 1, 'unknown_field': 'x'}, {'id': 2}])
+    with open(csv_path, encoding='utf-8', newline='') as f:
+        assert next(csv.reader(f)) == Csv.FIELDNAMES
+    rows = read_rows(csv_path)
+    assert [(r['id'], r['name']) for r in rows] == [('1', 'Listing 1'), ('2', '')]
+
+def test_rows_written_in_batches(csv_path):
+    persistence = Csv(csv_path, batch_size=2)
+    for i in range(3):
+        persistence.append('Rome, Italy', {'id': i})
+    assert [r['id'] for r in read_rows(csv_path)] == ['0', '1']  # third row still buffered
+    persistence.flush()
+    assert [r['id'] for r in read_rows(csv_path)] == ['0', '1', '2']
+
+def test_append_keeps_existing_rows(csv_path):
+    Csv(csv_path).save('Rome, Italy', [{'id': 1}])
+    Csv(csv_path, append=True).save('Rome, Italy', [{'id': 2}])
+    assert [r['id'] for r in read_rows(csv_path)] == ['1', '2']
+    Csv(csv_path).save('Rome, Italy', [{'id': 3}])
+    assert [r['id'] for r in read_rows(csv_path)] == ['3']
+
+def test_skip_written_rows_on_resume(csv_path):
+    Csv(csv_path).save('Rome, Italy', [{'id': 1}, {'id': 2}])
+    resumed = Csv(csv_path, append=True, skip_written=True)
+    resumed.save('Rome, Italy', [{'id': 2}, {'id': 3}])
+    resumed.save('Rome, Italy', [{'id': 3}, {'id': 4}])
+    assert [r['id'] for r in read_rows(csv_path)] == ['1', '2', '3', '4']
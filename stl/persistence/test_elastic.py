@@ -0,0 +1,9 @@
+from datetime import date
+from stl.persistence.elastic import Elastic
+
+def test_get_booking_months():
+    months = Elastic.get_booking_months(['2024-01-01', '2024-01-03', '2024-01-31', date(2024, 2, 10)])
+    assert months == {'2024-01': 0b1 | 0b100 | (1 << 30), '2024-02': 1 << 9}
+
+def test_get_booking_months_empty():
+    assert Elastic.get_booking_months([]) == {}
@@ -0,0 +1,52 @@
+from stl.persistence.jsonl import *
+import pytest
+
+@pytest.fixture
+def persistence(tmp_path):
+    return JsonLines(str(tmp_path))
+
+def test_append_is_written_immediately(persistence, tmp_path):
+    persistence.append('query', {'id': 1, 'name': 'Listing 1'})
+    assert list(iter_json_lines(str(tmp_path / 'listings.log.jsonl'))) == [{'id': 1, 'name': 'Listing 1'}]
+
+def test_compact_folds_log_into_snapshot(persistence, tmp_path):
+    persistence.save('query', [{'id': 1, 'name': 'Listing 1', 'price_per_date': {'2024-01-01': 100}},
+                               {'id': 2, 'name': 'Listing 2'}])
+    persistence.compact()
+    persistence.save('query', [{'id': 1, 'price_per_date': {'2024-01-02': 110}}, {'id': 3, 'name': 'New Listing'}])
+    persistence.compact()
+    assert list(iter_json_lines(str(tmp_path / 'listings.jsonl'))) == [
+        {'id': 1, 'name': 'Listing 1', 'price_per_date': {'2024-01-01': 100, '2024-01-02': 110}},
+        {'id': 2, 'name': 'Listing 2'},
+        {'id': 3, 'name': 'New Listing'},
+    ]
+    assert list(iter_json_lines(str(tmp_path / 'listings.log.jsonl'))) == []
+
+def test_torn_line_is_skipped(persistence, tmp_path):
+    persistence.save('query', [{'id': 1}])
+    with open(tmp_path / 'listings.log.jsonl', 'a') as f:
+        f.write('{"id": 2, "na')
+    persistence.compact()
+    assert list(iter_json_lines(str(tmp_path / 'listings.jsonl'))) == [{'id': 1}]
+
+def test_append_after_torn_line_is_kept(persistence, tmp_path):
+    persistence.save('query', [{'id': '1'}])
+    with open(tmp_path / 'listings.log.jsonl', 'a') as f:
+        f.write('{"id": "2", "na')
+    JsonLines(str(tmp_path)).save('query', [{'id': '3'}])
+    assert list(JsonLines(str(tmp_path)).get_listings(['1', '2', '3'])) == ['1', '3']
+
+def test_compacts_when_log_is_large(tmp_path):
+    persistence = JsonLines(str(tmp_path), compact_bytes=100)
+    for i in range(10):
+        persistence.append('query', {'id': i, 'name': 'Listing %d' % i})
+    persistence.flush()
+    assert len(list(iter_json_lines(str(tmp_path / 'listings.jsonl')))) >= 5
+
+def test_get_listings_reads_snapshot_log_and_appends(persistence):
+    persistence.save('query', [{'id': '1', 'name': 'Listing 1', 'fingerprint': 'a'}, {'id': '2', 'name': 'Listing 2'}])
+    persistence.compact()
+    persistence.append('query', {'id': '1', 'fingerprint': 'b'})
+    assert persistence.get_listings(['1', '3']) == {'1': {'id': '1', 'name': 'Listing 1', 'fingerprint': 'b'}}
+    persistence.append('query', {'id': '3', 'name': 'Listing 3'})
+    assert persistence.get_listings(['3']) == {'3': {'id': '3', 'name': 'Listing 3'}}
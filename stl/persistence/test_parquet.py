@@ -0,0 +1,47 @@
+import pytest
+
+pa = pytest.importorskip('pyarrow')
+
+from datetime import date, datetime
+from stl.persistence.parquet import Parquet
+
+@pytest.fixture
+def listings():
+    return [
+        {'id': '1', 'name': 'Listing 1', 'host_id': '5123456789', 'bedrooms': 2, 'avg_rating': 4.8,
+         'amenities': ['wifi', 'kitchen'], 'is_hotel': False, 'updated_at': datetime(2024, 1, 1, 12),
+         'price_currency': 'EUR', 'price_per_date': {'2024-06-01': 120, '2024-06-02': 130}, 'reviews': []},
+        {'id': '2', 'name': 'Listing 2', 'bedrooms': 'n/a', 'updated_at': '2024-01-01 12:00:00',
+         'price_per_date': None},
+    ]
+
+def test_schema_follows_elastic_mappings():
+    schema = Parquet.get_listings_schema()
+    assert schema.field('bedrooms').type == pa.int16()
+    assert schema.field('avg_rating').type == pa.float32()
+    assert schema.field('amenities').type == pa.list_(pa.string())
+    assert 'bookings' not in schema.names and 'coordinates' not in schema.names
+
+def test_save_and_read(tmp_path, listings):
+    Parquet(str(tmp_path)).save('Rome, Italy', listings)
+    Parquet(str(tmp_path)).save('Madrid, Spain', listings[:1])
+
+    table = Parquet.read_listings(str(tmp_path), 'Rome, Italy').sort_by('id')
+    assert table.column('id').to_pylist() == ['1', '2']
+    assert table.column('host_id').to_pylist() == [5123456789, None]
+    assert table.column('bedrooms').to_pylist() == [2, None]
+    assert table.column('amenities').to_pylist() == [['wifi', 'kitchen'], None]
+
+    prices = Parquet.read_prices(str(tmp_path), 'Rome, Italy').sort_by('date')
+    assert prices.column('date').to_pylist() == [date(2024, 6, 1), date(2024, 6, 2)]
+    assert prices.column('price').to_pylist() == [120.0, 130.0]
+    assert Parquet.read_prices(str(tmp_path)).num_rows == 4
+
+
+def test_save_stream_writes_batches(tmp_path):
+    persistence = Parquet(str(tmp_path))
+    persistence.STREAM_BATCH_SIZE = 2
+    persistence.save_stream('Rome, Italy', ({'id': str(i)} for i in range(5)))
+    dataset = pa.dataset.dataset(str(tmp_path / 'listings'), format='parquet', partitioning='hive')
+    assert len(dataset.files) == 3
+    assert sorted(Parquet.read_listings(str(tmp_path)).column('id').to_pylist()) == ['0', '1', '2', '3', '4']
@@ -1,18 +1,22 @@
+import asyncio
 import json
-import requests
 
-from datetime import timedelta
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from logging import Logger
+from queue import Full, Queue
+from threading import Event, Thread
 from urllib.parse import urlparse, parse_qs
 
 from stl.endpoint.base_endpoint import BaseEndpoint
-from stl.endpoint.calendar import Calendar
+from stl.endpoint.calendar import BookingCalendar, Calendar
 from stl.endpoint.explore import Explore
-from stl.endpoint.pdp import Pdp
+from stl.endpoint.pdp import ListingSummary, Pdp
 from stl.endpoint.reviews import Reviews
 from stl.exception.api import ForbiddenException
 from stl.persistence.elastic import Elastic
 from stl.persistence import PersistenceInterface
+from stl.scraper.checkpoint import SearchCheckpoint
 
 
 class AirbnbScraperInterface:
@@ -21,75 +25,403 @@ class AirbnbScraperInterface:
 
 
 class AirbnbSearchScraper(AirbnbScraperInterface):
-    def __init__(self, explore: Explore, pdp: Pdp, reviews: Reviews, persistence: PersistenceInterface, logger: Logger):
+    PREFETCH_PAGES = 1  # number of explore pages fetched ahead of the page being processed
+
+    def __init__(
+            self,
+            explore: Explore,
+            pdp: Pdp,
+            reviews: Reviews,
+            persistence: PersistenceInterface,
+            logger: Logger,
+            concurrency: int = 1,
+            refresh: bool = False,
+            with_reviews: bool = False
+    ):
         self.__logger = logger
+        self.__concurrency = max(1, concurrency)
+        self.__refresh = refresh
+        self.__with_reviews = with_reviews
         self.__explore = explore
         self.__geography = {}
         self.__ids_seen = set()
+        self.__n_listings = 0
         self.__pdp = pdp
         self.__persistence = persistence
         self.__reviews = reviews
 
-    def run(self, query: str, params: dict):
-        listings = []
-        url = self.__explore.get_url(query, params)
-        data, pagination = self.__explore.search(url)
+    def run(self, query: str, params: dict, checkpoint: SearchCheckpoint = None):
+        """Search and save all listings for query. Listings are saved in batches as they are parsed. With a
+        checkpoint, progress is recorded after every saved batch, and a run that failed before completing is resumed
+        from its last checkpoint."""
+        first_page, page_params, n_listings = 1, params, 0
+        state = checkpoint.load() if checkpoint else None
+        if state:
+            self.__restore_checkpoint(state)
+            first_page, page_params, n_listings = state['page'], state['params'], state['n_listings']
+            self.__logger.info('Resuming search for {} from page {} ({} listings)'.format(query, first_page, n_listings))
+
+        batch = []
+        for page, next_params, listings in self.__iter_listing_pages(
+                query, params, page_params, first_page, n_listings):
+            batch.extend(listings)
+            if len(batch) >= self.__persistence.STREAM_BATCH_SIZE or next_params is None:
+                self.__persistence.save_stream(query, batch)
+                batch = []
+                if checkpoint:  # only once the listings of all pages up to here are saved
+                    self.__save_checkpoint(checkpoint, page + 1, next_params, n_listings=self.__n_listings)
+        if batch:
+            self.__persistence.save_stream(query, batch)
+
+        if checkpoint:
+            checkpoint.clear()
+        self.__logger.info('Got data for {} listings.'.format(self.__n_listings))
+
+    def iter_listings(self, query: str, params: dict):
+        """Yield listings for query as they are parsed, e.g. for `PersistenceInterface.save_stream`."""
+        for _, _, listings in self.__iter_listing_pages(query, params, params):
+            yield from listings
+
+    def sweep(self, query: str, params: dict, windows: list, checkpoint: SearchCheckpoint = None):
+        """Search once for each (checkin, checkout) window.
+
+        PDP data is fetched only the first time a listing is seen; for every later window only the explore search
+        pages are requested, and their nightly prices are merged into the listing's `price_per_date`. With a
+        checkpoint, a sweep that failed before completing is resumed from the page it stopped at.
+        """
+        listings = {}
+        first_window, first_page, page_params = 0, 1, None
+        state = checkpoint.load() if checkpoint else None
+        if state:
+            self.__restore_checkpoint(state)
+            listings = checkpoint.load_listings()
+            first_window, first_page, page_params = state['window'], state['page'], state['params']
+            self.__logger.info('Resuming sweep for {} from window {}, page {} ({} listings)'.format(
+                query, first_window + 1, first_page, len(listings)))
+
+        for window, (checkin, checkout) in enumerate(windows[first_window:], start=first_window):
+            window_params = params | {'checkin': checkin, 'checkout': checkout}
+            pages = self.__get_pages(query, page_params or window_params)
+            for page, (data, pagination, next_params) in enumerate(pages, start=first_page):
+                data_cache = {}
+                if not self.__geography:
+                    self.__set_geography(data, pagination, query, window_params)
+                self.__logger.info('Searching page {} for {} ({} - {})'.format(page, query, checkin, checkout))
+                listing_ids = list(dict.fromkeys(self.__pdp.collect_listings_from_sections(
+                    data, self.__geography, data_cache, checkin, checkout)))
+
+                new_ids = [listing_id for listing_id in listing_ids if listing_id not in self.__ids_seen]
+                self.__ids_seen.update(new_ids)
+                for listing_id, listing in self.__get_listings(new_ids, data_cache):
+                    if 'id' not in listing:
+                        self.__logger.error(f"Issue in getting listing {listing_id}")
+                        continue
+                    listings[listing_id] = listing
+                    self.__log_listing(len(listings), listing)
+                    if checkpoint:
+                        checkpoint.append_listing(listing_id, listing)
+
+                for listing_id in set(listing_ids) - set(new_ids):
+                    if listing_id in listings:
+                        self.__merge_price_per_date(listings[listing_id], data_cache[listing_id])
+                        if checkpoint and data_cache[listing_id].price_per_date:
+                            checkpoint.append_listing(
+                                listing_id, {'price_per_date': data_cache[listing_id].price_per_date})
+
+                if checkpoint:
+                    if next_params is None:  # continue with the first page of the next window
+                        self.__save_checkpoint(checkpoint, 1, None, window=window + 1)
+                    else:
+                        self.__save_checkpoint(checkpoint, page + 1, next_params, window=window)
+            first_page, page_params = 1, None
+
+        self.__persistence.save(query, list(listings.values()))
+        if checkpoint:
+            checkpoint.clear()
+        self.__logger.info('Got data for {} listings over {} date windows.'.format(len(listings), len(windows)))
+
+    def __iter_listing_pages(self, query: str, params: dict, page_params: dict | None, first_page: int = 1,
+                             n_listings: int = 0):
+        """Yield (page, next_params, listings) for each search results page, starting with the page page_params gets.
+        listings is a generator, to be consumed before the next page is requested."""
+        self.__n_listings = n_listings
+        pages = self.__get_pages(query, page_params) if page_params is not None else []
+        for page, (data, pagination, next_params) in enumerate(pages, start=first_page):
+            data_cache = {}  # search results of this page only
+            if not self.__geography:
+                self.__set_geography(data, pagination, query, params)
+            self.__logger.info('Searching page {} for {}'.format(page, query))
+            listing_ids = self.__pdp.collect_listings_from_sections(
+                data, self.__geography, data_cache, params.get('checkin', None), params.get('checkout', None))
+            listing_ids = self.__filter_seen(listing_ids)
+            yield page, next_params, self.__iter_parsed_listings(listing_ids, data_cache)
+
+    def __iter_parsed_listings(self, listing_ids: list, data_cache: dict):
+        for listing_id, listing in self.__get_listings(listing_ids, data_cache):
+            if 'id' not in listing:
+                self.__logger.error(f"Issue in getting listing {listing_id}")
+                continue
+            self.__n_listings += 1
+            self.__log_listing(self.__n_listings, listing)
+            yield listing
+
+    def __restore_checkpoint(self, state: dict):
+        self.__ids_seen.update(state['ids_seen'])
+        self.__geography.update(state['geography'])
+
+    def __save_checkpoint(self, checkpoint: SearchCheckpoint, page: int, params: dict | None, **state):
+        """Record the page to continue from, and the params to get it with (None if there are no more pages)."""
+        checkpoint.save(state | {
+            'page':      page,
+            'params':    params,
+            'ids_seen':  list(self.__ids_seen),
+            'geography': self.__geography,
+        })
+
+    @staticmethod
+    def __merge_price_per_date(listing: dict, summary: ListingSummary):
+        price_per_date = summary.price_per_date
+        if price_per_date:
+            listing['price_per_date'] = (listing.get('price_per_date') or {}) | price_per_date
+
+    def __set_geography(self, data: dict, pagination: dict, query: str, params: dict):
         self.__geography.update(self.__normalize_geography(data, query))
         self.__logger.info('Getting {} results for "{}" - ({})'.format(
             pagination['totalCount'], self.__geography['fullAddress'], params)
         )
-        n_listings = 0
-        page = 1
-        data_cache = {}
-        while True:
-            self.__logger.info('Searching page {} for {}'.format(page, query))
-            listing_ids = self.__pdp.collect_listings_from_sections(
-                data, self.__geography, data_cache, params.get('checkin', None), params.get('checkout', None))
-            for listing_id in listing_ids:  # request each property page
-                if listing_id in self.__ids_seen:
-                    self.__logger.info(
-                        'Duplicate listing: {}'.format(listing_id))
-                    continue  # skip duplicates
-                self.__ids_seen.add(listing_id)
-                #reviews = self.__reviews.get_reviews(listing_id)
-                reviews = [] # skip review as list, not of interest
-                listing = self.__pdp.get_listing(
-                    listing_id, data_cache, self.__geography, reviews)
-                if 'id' not in listing:
-                    self.__logger.error(f"Issue in getting listing {listing_id}")
-                    continue 
-                n_listings += 1
-
-                msg = '{:>4} {:<12} {:>12} {:<5}{:<9}{} {:<1} {} ({})'.format(
-                    '#' + str(n_listings),
-                    listing['city'],
-                    '{}{} {}'.format(listing['price_currency'],
-                                     listing['price_rate'],
-                                    listing['price_rate_type']),
-                    str(listing['person_capacity']) +
-                    'pr' if listing['person_capacity'] else '0pr',
-                    '{:.2f}ba'.format(listing['bathrooms']),
-                    listing['room_and_property_type'],
-                    '- {} -'.format(listing['neighborhood']
-                                    ) if listing['neighborhood'] else '',
-                    listing['name'],
-                    listing['url']
-                )
-                self.__logger.info(msg)
-                listings.append(listing)
-
-            self.__add_search_params(params, url)
-            items_offset = pagination['itemsOffset']
-            params.update({'itemsOffset': items_offset})
+
+    def __log_listing(self, n_listings: int, listing: dict):
+        msg = '{:>4} {:<12} {:>12} {:<5}{:<9}{} {:<1} {} ({})'.format(
+            '#' + str(n_listings),
+            listing['city'],
+            '{}{} {}'.format(listing['price_currency'],
+                             listing['price_rate'],
+                            listing['price_rate_type']),
+            str(listing['person_capacity']) +
+            'pr' if listing['person_capacity'] else '0pr',
+            '{:.2f}ba'.format(listing['bathrooms']),
+            listing['room_and_property_type'],
+            '- {} -'.format(listing['neighborhood']
+                            ) if listing['neighborhood'] else '',
+            listing['name'],
+            listing['url']
+        )
+        self.__logger.info(msg)
+
+    def __get_pages(self, query: str, params: dict):
+        """Get (data, pagination, next_params) search results pages, prefetched in the background when running
+        concurrently. Map searches are split into tiles, see `__iter_tile_pages`."""
+        if 'tiles' in params:  # resuming a map search
+            return self.__iter_tile_pages(query, params['tiles'])
+        if Explore.is_map_search(params):
+            return self.__iter_tile_pages(query, [params])
+
+        pages = self.__iter_pages(query, params)
+        if self.__concurrency > 1:
+            pages = self.__prefetch_pages(pages)
+
+        return pages
+
+    def __iter_tile_pages(self, query: str, tiles: list):
+        """Search map box tiles, splitting every tile with more results than a search returns into four (quadtree),
+        so that all listings in the box are found. Tiles are searched `concurrency` at a time; listings found in more
+        than one tile are dropped by the caller. next_params of each page holds the tiles left to search."""
+        if self.__concurrency > 1:
+            yield from self.__iter_tile_pages_concurrently(query, tiles)
+            return
+
+        tiles = deque(tiles)
+        while tiles:
+            tile = tiles.popleft()
+            for page, (data, pagination, next_params) in enumerate(self.__iter_pages(query, tile)):
+                if page == 0:
+                    subtiles = self.__get_subtiles(tile, pagination)
+                    if subtiles:
+                        tiles.extend(subtiles)
+                        break
+                remaining = ([next_params] if next_params else []) + list(tiles)
+                yield data, pagination, {'tiles': remaining} if remaining else None
+
+    def __iter_tile_pages_concurrently(self, query: str, tiles: list):
+        executor = ThreadPoolExecutor(max_workers=self.__concurrency)
+        pending = {executor.submit(self.__search_tile, query, tile): tile for tile in tiles}
+        try:
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    tile = pending.pop(future)
+                    pages, subtiles = future.result()
+                    for subtile in subtiles:
+                        pending[executor.submit(self.__search_tile, query, subtile)] = subtile
+                    for n_page, (data, pagination, _) in enumerate(pages, start=1):
+                        # the tile is searched again if the run is resumed before its last page was processed
+                        remaining = list(pending.values()) + ([tile] if n_page < len(pages) else [])
+                        yield data, pagination, {'tiles': remaining} if remaining else None
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def __search_tile(self, query: str, tile: dict) -> tuple:
+        """Get all (pages, []) of a tile, or ([], subtiles) if it has too many results and has been split."""
+        pages = []
+        for data, pagination, next_params in self.__iter_pages(query, tile):
+            if not pages:
+                subtiles = self.__get_subtiles(tile, pagination)
+                if subtiles:
+                    return [], subtiles
+            pages.append((data, pagination, next_params))
+
+        return pages, []
+
+    def __get_subtiles(self, tile: dict, pagination: dict) -> list:
+        """Split tile if its first page shows more results than a search returns."""
+        if pagination['totalCount'] <= Explore.RESULT_CAP or tile.get('itemsOffset'):
+            return []
+        subtiles = Explore.split_map(tile)
+        box = ', '.join(str(tile[key]) for key in Explore.MAP_BOX_PARAMS)
+        if subtiles:
+            self.__logger.info('Splitting map tile ({}) with {} results'.format(box, pagination['totalCount']))
+        else:
+            self.__logger.warning('Map tile ({}) too small to split, only {} of {} results are returned'.format(
+                box, Explore.RESULT_CAP, pagination['totalCount']))
+
+        return subtiles
+
+    def __iter_pages(self, query: str, params: dict):
+        """Follow the explore pagination cursor, yielding (data, pagination, next_params) for each search results
+        page. next_params gets the next page, it is None for the last page."""
+        params = dict(params)
+        while params is not None:
+            url = self.__explore.get_url(query, params)
+            data, pagination = self.__explore.search(url)
             if pagination.get('hasNextPage'):
-                url = self.__explore.get_url(query, params)
-                data, pagination = self.__explore.search(url)
-                page += 1
+                params = dict(params)
+                self.__add_search_params(params, url)
+                params.update({'itemsOffset': pagination['itemsOffset']})
+            else:
+                params = None
+            yield data, pagination, params
+
+    def __prefetch_pages(self, pages):
+        """Produce pages in a background thread, so that the next page is already in flight (or queued) while the
+        current one is being processed. Errors raised by the producer are re-raised in the consumer."""
+        buffer = Queue(maxsize=self.PREFETCH_PAGES)
+        stop = Event()
+        end = object()
+
+        def put(item) -> bool:
+            while not stop.is_set():
+                try:
+                    buffer.put(item, timeout=0.1)
+                    return True
+                except Full:
+                    continue
+            return False
+
+        def produce():
+            try:
+                for page in pages:
+                    if not put(page):
+                        return
+            except Exception as e:
+                put(e)
+                return
+            put(end)
+
+        Thread(target=produce, name='explore-pages', daemon=True).start()
+        try:
+            while True:
+                item = buffer.get()
+                if item is end:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+
+    def __filter_seen(self, listing_ids: list) -> list:
+        """Drop listings already seen during this run, keeping the search result order."""
+        new_ids = []
+        for listing_id in listing_ids:
+            if listing_id in self.__ids_seen:
+                self.__logger.info(
+                    'Duplicate listing: {}'.format(listing_id))
+                continue  # skip duplicates
+            self.__ids_seen.add(listing_id)
+            new_ids.append(listing_id)
+
+        return new_ids
+
+    def __get_listings(self, listing_ids: list, data_cache: dict):
+        """Get (listing_id, listing) pairs in the order given. Listings whose search result fingerprint hasn't changed
+        since they were saved are carried forward from persistence, only the others are fetched. Search results are
+        dropped from data_cache once their listing is parsed."""
+        previous = self.__get_previous_listings(listing_ids)
+        unchanged = {} if self.__refresh else {
+            listing_id: listing for listing_id, listing in previous.items()
+            if self.__is_unchanged(listing, data_cache[listing_id])
+        }
+        if unchanged:
+            self.__logger.info('{} of {} listings unchanged since last saved'.format(len(unchanged), len(listing_ids)))
+
+        fetched = iter(self.__fetch_listings(
+            [listing_id for listing_id in listing_ids if listing_id not in unchanged], data_cache, previous))
+        for listing_id in listing_ids:
+            if listing_id in unchanged:
+                listing = self.__pdp.carry_forward_listing(unchanged[listing_id], data_cache[listing_id])
             else:
-                break
+                listing = next(fetched)
+            del data_cache[listing_id]
+            yield listing_id, listing
 
-        self.__persistence.save(query, listings)
-        self.__logger.info('Got data for {} listings.'.format(n_listings))
+    def __is_unchanged(self, listing: dict, summary: ListingSummary) -> bool:
+        """Check whether a saved listing can be carried forward. With reviews, its saved reviews must be complete, as
+        listings saved by a run without reviews have none."""
+        if not listing.get('fingerprint') or listing['fingerprint'] != summary.fingerprint:
+            return False
+
+        return not self.__with_reviews or len(listing.get('reviews') or []) >= (summary.review_count or 0)
+
+    def __get_previous_listings(self, listing_ids: list) -> dict:
+        """Get saved listings, needed to skip unchanged listings or to only fetch new reviews."""
+        if not listing_ids or (self.__refresh and not self.__with_reviews):
+            return {}
+        return self.__persistence.get_listings(listing_ids)
+
+    def __fetch_listings(self, listing_ids: list, data_cache: dict, previous: dict):
+        """Fetch and parse PDP data for listings, in the order given."""
+        if self.__concurrency == 1:
+            return (
+                self.__get_listing(listing_id, data_cache, previous.get(listing_id)) for listing_id in listing_ids
+            )
+
+        return asyncio.run(self.__fetch_listings_async(listing_ids, data_cache, previous))
+
+    async def __fetch_listings_async(self, listing_ids: list, data_cache: dict, previous: dict) -> list:
+        """Fetch PDP data for up to `concurrency` listings at a time. Results keep the order of listing_ids."""
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.__concurrency)
+
+        with ThreadPoolExecutor(max_workers=self.__concurrency) as executor:
+            async def fetch(listing_id: str) -> dict:
+                async with semaphore:
+                    return await loop.run_in_executor(
+                        executor, self.__get_listing, listing_id, data_cache, previous.get(listing_id))
+
+            return await asyncio.gather(*[fetch(listing_id) for listing_id in listing_ids])
+
+    def __get_listing(self, listing_id: str, data_cache: dict, previous: dict = None) -> dict:
+        reviews = self.__get_reviews(listing_id, previous) if self.__with_reviews else []
+        return self.__pdp.get_listing(listing_id, data_cache, self.__geography, reviews)
+
+    def __get_reviews(self, listing_id: str, previous: dict = None) -> list:
+        """Get reviews of a listing. For listings saved before, only reviews newer than the saved ones are fetched."""
+        saved_reviews = (previous or {}).get('reviews') or []
+        since = max((review['created_at'] for review in saved_reviews), default=None)
+        # the transport keeps requests of all listing workers and their review pages within the connection pool
+        new_reviews = self.__reviews.get_reviews(listing_id, since=since, concurrency=self.__concurrency)
+
+        return new_reviews + saved_reviews
 
     @staticmethod
     def __add_search_params(params: dict, url: str):
@@ -135,21 +467,56 @@ class AirbnbSearchScraper(AirbnbScraperInterface):
 
 
 class AirbnbCalendarScraper(AirbnbScraperInterface):
-    def __init__(self, calendar: Calendar, persistence: PersistenceInterface, logger: Logger):
+    def __init__(self, calendar: Calendar, persistence: PersistenceInterface, logger: Logger, concurrency: int = 1):
         self.__calendar = calendar
+        self.__concurrency = max(1, concurrency)
         self.__logger = logger
         self.__persistence = persistence
 
     def run(self, source: str, since: str):
         if source == 'elasticsearch':
             assert isinstance(self.__persistence, Elastic)
-            for listing_id in self.__persistence.get_all_index_ids(since):
-                self.__update_calendar_and_pricing(listing_id)
+            try:
+                listing_ids = self.__persistence.get_all_index_ids(since)
+                if self.__concurrency == 1:
+                    results = [self.__refresh_listing(listing_id) for listing_id in listing_ids]
+                else:
+                    results = self.__refresh_listings_concurrently(listing_ids)
+                self.__logger.info('Updated {} listings, {} failed.'.format(results.count(True), results.count(False)))
+            finally:
+                for error in self.__persistence.flush():
+                    self.__logger.error('Bulk update failed: {}'.format(error))
         else:  # source is a listing id
             booking_calendar, min_nights, max_nights = self.__calendar.get_calendar(
                 source)
             ranges = Calendar.get_date_ranges('available', booking_calendar)
-            return booking_calendar, self.__calendar.get_rate_data(source, ranges, min_nights, max_nights, True)
+            return booking_calendar, self.__calendar.get_rate_data(
+                source, ranges, min_nights, max_nights, True, self.__concurrency)
+
+    def __refresh_listings_concurrently(self, listing_ids) -> list:
+        """Refresh listings in a pool of `concurrency` workers. At most two listings per worker are taken from the
+        scan cursor ahead of the workers, so the scroll is only advanced as fast as listings are processed."""
+        results = []
+        with ThreadPoolExecutor(max_workers=self.__concurrency) as executor:
+            pending = set()
+            for listing_id in listing_ids:
+                if len(pending) >= 2 * self.__concurrency:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    results += [future.result() for future in done]
+                pending.add(executor.submit(self.__refresh_listing, listing_id))
+            results += [future.result() for future in wait(pending).done]
+
+        return results
+
+    def __refresh_listing(self, listing_id: str) -> bool:
+        """Update calendar and pricing for a listing. Errors are logged, so that one failing listing does not stop
+        the others."""
+        try:
+            self.__update_calendar_and_pricing(listing_id)
+            return True
+        except Exception as e:
+            self.__logger.error('{}: could not update calendar and pricing: {}'.format(listing_id, e))
+            return False
 
     def __update_calendar_and_pricing(self, listing_id):
         assert isinstance(self.__persistence, Elastic)
@@ -158,22 +525,20 @@ class AirbnbCalendarScraper(AirbnbScraperInterface):
         try:
             calendar, min_nights, max_nights = self.__calendar.get_calendar(
                 listing_id)
-            assert isinstance(calendar, dict)
-            for date_range in Calendar.get_date_ranges('booked', calendar):
+            assert isinstance(calendar, BookingCalendar)
+            for date_range in calendar.get_ranges('booked'):
                 if date_range['length'] > 62:
                     # assume 62+ night bookings not real and remove them from booking calendar
-                    booking_dates = [(date_range['start'] + timedelta(days=i)).strftime('%Y-%m-%d')
-                                     for i in range(date_range['length'])]
-                    calendar = {dt: calendar[dt] for dt in sorted(
-                        set(calendar) - set(booking_dates))}
+                    calendar.exclude(date_range['start'], date_range['length'])
                 elif date_range['length'] > 50:
                     self.__logger.warning('{}: {} day booking'.format(
                         listing_id, date_range['length']))
 
             self.__persistence.update_calendar(listing_id, calendar)
             ranges = Calendar.get_date_ranges('available', calendar)
+            # the transport keeps probes of all refreshing workers within the connection pool
             pricing_doc = self.__calendar.get_rate_data(
-                listing_id, ranges, min_nights, max_nights)
+                listing_id, ranges, min_nights, max_nights, concurrency=self.__concurrency)
             if not pricing_doc:
                 self.__logger.warning(
                     'Could not get any pricing data for {}'.format(listing_id))
@@ -189,11 +554,10 @@ class AirbnbCalendarScraper(AirbnbScraperInterface):
                     'GONE: deleting listing id {}'.format(listing_id))
                 self.__persistence.mark_deleted(listing_id)
 
-    @staticmethod
-    def __exists_listing(listing_id):
+    def __exists_listing(self, listing_id):
         # check if listing still exists
         url = BaseEndpoint.build_airbnb_url('/rooms/{}'.format(listing_id))
-        response = requests.get(url)
+        response = self.__calendar.transport.get(url)
 
         if response.status_code == 200:  # OK
             return True
@@ -0,0 +1,78 @@
+import hashlib
+import json
+import os
+
+from datetime import datetime
+
+from stl.persistence.json import merge_dicts
+from stl.persistence.jsonl import iter_json_lines
+
+
+class SearchCheckpoint:
+    """Progress of a search run, so that a failed run can be resumed where it stopped.
+
+    The cursor of the next page, the listing ids seen so far and the search geography are written to
+    `<key>.state.json` once the listings before that cursor are saved: after each saved batch for searches, after
+    each page for sweeps. Sweeps, which only save at the end, also append their listings to `<key>.listings.jsonl` as
+    they are parsed. The key is a hash of the query, search parameters and sweep windows, so that a checkpoint is only
+    resumed by the same search.
+    """
+
+    def __init__(self, checkpoint_path: str, query: str, params: dict, windows: list = None):
+        key = hashlib.sha1(
+            json.dumps([query, params, windows or []], sort_keys=True).encode('utf-8')).hexdigest()[:16]
+        self.__checkpoint_path = checkpoint_path
+        self.__state_path = os.path.join(checkpoint_path, '{}.state.json'.format(key))
+        self.__listings_path = os.path.join(checkpoint_path, '{}.listings.jsonl'.format(key))
+        self.__listings_file = None
+
+    def exists(self) -> bool:
+        return os.path.isfile(self.__state_path)
+
+    def load(self) -> dict | None:
+        """Get state written by the last checkpoint, or None if there is none."""
+        if not self.exists():
+            return None
+        with open(self.__state_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def load_listings(self) -> dict:
+        """Get listings appended before the last checkpoint, by listing id."""
+        listings = {}
+        for listing_id, listing in iter_json_lines(self.__listings_path):
+            listings[listing_id] = merge_dicts(listings[listing_id], listing) if listing_id in listings else listing
+        for listing in listings.values():
+            if isinstance(listing.get('updated_at'), str):
+                listing['updated_at'] = datetime.fromisoformat(listing['updated_at'])
+
+        return listings
+
+    def append_listing(self, listing_id: str, listing: dict):
+        """Append a listing, or an update of one appended before. Written to disk by the next `save`."""
+        if self.__listings_file is None:
+            os.makedirs(self.__checkpoint_path, exist_ok=True)
+            self.__listings_file = open(self.__listings_path, 'a', encoding='utf-8')
+        self.__listings_file.write(json.dumps([listing_id, listing], default=str, separators=(',', ':')) + '\n')
+
+    def save(self, state: dict):
+        """Write state, once the listings appended so far are on disk. The state file is replaced atomically, so a
+        crash leaves either the previous or the new checkpoint behind."""
+        if self.__listings_file is not None:
+            self.__listings_file.flush()
+            os.fsync(self.__listings_file.fileno())
+        os.makedirs(self.__checkpoint_path, exist_ok=True)
+        tmp_path = self.__state_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, default=str, separators=(',', ':'))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.__state_path)
+
+    def clear(self):
+        """Remove the checkpoint, before starting over or once the run is complete."""
+        if self.__listings_file is not None:
+            self.__listings_file.close()
+            self.__listings_file = None
+        for path in (self.__state_path, self.__listings_path):
+            if os.path.isfile(path):
+                os.remove(path)
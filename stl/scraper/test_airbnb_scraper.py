@@ -0,0 +1,84 @@
+import logging
+
+from dataclasses import fields
+
+from stl.endpoint.pdp import ListingSummary, Pdp
+from stl.persistence import PersistenceInterface
+from stl.scraper.airbnb_scraper import AirbnbSearchScraper
+
+
+class FakeExplore:
+    GEOGRAPHY = {'city': 'Rome', 'country': 'Italy', 'fullAddress': 'Rome, Italy', 'placeId': 'p', 'state': 'Lazio'}
+
+    def __init__(self, listing_ids: list):
+        self.listing_ids = listing_ids
+
+    def get_url(self, query: str, params: dict = None) -> str:
+        return 'https://www.airbnb.com/api/v3/ExploreSearch?variables={"request":{}}'
+
+    def search(self, url: str):
+        data = {'data': {'dora': {'exploreV3': {'metadata': {'geography': self.GEOGRAPHY}, 'ids': self.listing_ids}}}}
+        return data, {'totalCount': len(self.listing_ids), 'hasNextPage': False}
+
+
+class FakePdp:
+    carry_forward_listing = staticmethod(Pdp.carry_forward_listing)
+
+    def __init__(self, review_count: int):
+        self.review_count = review_count
+        self.fetched = []
+
+    def collect_listings_from_sections(self, data, geography, data_cache, checkin=None, checkout=None) -> list:
+        listing_ids = data['data']['dora']['exploreV3']['ids']
+        for listing_id in listing_ids:
+            summary = ListingSummary(**{field.name: None for field in fields(ListingSummary)} | {
+                'bathrooms': 1.0, 'city': 'Rome', 'name': 'Listing', 'price_currency': 'EUR', 'price_rate': 90,
+                'price_rate_type': 'nightly', 'review_count': self.review_count,
+            })
+            summary.fingerprint = Pdp.get_fingerprint(summary)
+            data_cache[listing_id] = summary
+
+        return listing_ids
+
+    def get_listing(self, listing_id: str, data_cache: dict, geography: dict, reviews: list) -> dict:
+        self.fetched.append(listing_id)
+        return self.carry_forward_listing({'id': listing_id, 'reviews': reviews, 'url': ''}, data_cache[listing_id])
+
+
+class FakeReviews:
+    def get_reviews(self, listing_id: str, since: str = None, concurrency: int = 1) -> list:
+        return [{'comments': 'Great', 'created_at': '2024-01-0%d' % day} for day in (1, 2)]
+
+
+class MemoryPersistence(PersistenceInterface):
+    def __init__(self):
+        self.listings = {}
+
+    def save(self, query: str, listings: list):
+        self.listings.update((listing['id'], listing) for listing in listings)
+
+    def get_listings(self, listing_ids: list) -> dict:
+        return {listing_id: self.listings[listing_id] for listing_id in listing_ids if listing_id in self.listings}
+
+
+def scrape(persistence: PersistenceInterface, pdp: FakePdp, with_reviews: bool):
+    scraper = AirbnbSearchScraper(
+        FakeExplore(['1']), pdp, FakeReviews(), persistence, logging.getLogger('test'), with_reviews=with_reviews)
+    scraper.run('Rome, Italy', {})
+
+
+def test_unchanged_listing_without_saved_reviews_is_fetched_with_reviews():
+    persistence = MemoryPersistence()
+    scrape(persistence, FakePdp(review_count=2), with_reviews=False)
+    assert persistence.listings['1']['reviews'] == []
+
+    pdp = FakePdp(review_count=2)
+    scrape(persistence, pdp, with_reviews=False)
+    assert pdp.fetched == []  # unchanged, carried forward
+
+    scrape(persistence, pdp, with_reviews=True)
+    assert pdp.fetched == ['1']
+    assert len(persistence.listings['1']['reviews']) == 2
+
+    scrape(persistence, pdp, with_reviews=True)
+    assert pdp.fetched == ['1']  # reviews complete now
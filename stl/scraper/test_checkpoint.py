@@ -0,0 +1,21 @@
+from datetime import datetime
+
+from stl.scraper.checkpoint import SearchCheckpoint
+
+
+def test_checkpoint_roundtrip_and_clear(tmp_path):
+    checkpoint = SearchCheckpoint(str(tmp_path), 'Rome', {'priceMax': 100}, [('2024-01-01', '2024-01-03')])
+    assert checkpoint.load() is None
+    checkpoint.append_listing('1', {'id': '1', 'price_per_date': {'2024-01-01': 90}, 'updated_at': datetime(2024, 1, 1)})
+    checkpoint.append_listing('1', {'price_per_date': {'2024-01-02': 95}})
+    checkpoint.save({'page': 3, 'params': {'itemsOffset': 40}, 'ids_seen': ['1']})
+
+    resumed = SearchCheckpoint(str(tmp_path), 'Rome', {'priceMax': 100}, [('2024-01-01', '2024-01-03')])
+    assert resumed.load() == {'page': 3, 'params': {'itemsOffset': 40}, 'ids_seen': ['1']}
+    assert resumed.load_listings() == {'1': {
+        'id': '1', 'price_per_date': {'2024-01-01': 90, '2024-01-02': 95}, 'updated_at': datetime(2024, 1, 1)}}
+    assert not SearchCheckpoint(str(tmp_path), 'Rome', {'priceMax': 200}).exists()
+
+    resumed.clear()
+    assert not checkpoint.exists()
+    assert resumed.load_listings() == {}